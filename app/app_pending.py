@@ -1,8 +1,13 @@
 # app/app_pending.py
 import os
-import requests
+import sys
+from pathlib import Path
+
 import streamlit as st
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))  # repo root, for `app.*`
+from app import http_client
+
 # ----- ENV -----
 APPS_SCRIPT_URL   = os.environ.get("APPS_SCRIPT_URL", "")
 APPS_SCRIPT_TOKEN = os.environ.get("APPS_SCRIPT_TOKEN", "")
@@ -69,7 +74,8 @@ if submit:
             "note": note
         }
         try:
-            r = requests.post(APPS_SCRIPT_URL, json=payload, timeout=20)
+            # not retried: a lost response may still have created the order
+            r = http_client.post(APPS_SCRIPT_URL, json=payload, endpoint="gas:add_pending")
             r.raise_for_status()
             j = r.json()
             if j.get("ok"):
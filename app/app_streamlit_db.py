@@ -1,8 +1,13 @@
 # app_streamlit_db.py
 import os
-import requests
+import sys
 import streamlit as st
 from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))  # repo root, for `app.*` / storage
+from app import http_client, license_store
+from app.sentiment_data import get_data, last_error
 
 APPS_SCRIPT_URL = os.environ.get("APPS_SCRIPT_URL", "").strip()
 SECRET_TOKEN    = os.environ.get("APPS_SECRET_TOKEN", "").strip()
@@ -10,6 +15,9 @@ SECRET_TOKEN    = os.environ.get("APPS_SECRET_TOKEN", "").strip()
 st.set_page_config(page_title="AI Market Sentiment Pro", page_icon="📈", layout="wide")
 
 def verify_license(email: str, license_key: str):
+    return license_store.verify(email.strip(), license_key.strip(), _verify_remote, APPS_SCRIPT_URL, SECRET_TOKEN)
+
+def _verify_remote(email: str, license_key: str):
     try:
         payload = {
             "token": SECRET_TOKEN,
@@ -17,7 +25,7 @@ def verify_license(email: str, license_key: str):
             "email": email.strip(),
             "license_key": license_key.strip(),
         }
-        r = requests.post(APPS_SCRIPT_URL, json=payload, timeout=15)
+        r = http_client.post(APPS_SCRIPT_URL, json=payload, endpoint="gas:verify", idempotent=True)
         if r.headers.get("content-type","").startswith("application/json"):
             return r.json()
         return {"ok": False, "error": "bad_content_type"}
@@ -60,6 +68,8 @@ if not st.session_state.auth_ok:
             st.error("Your license is invalid or expired. Please renew to continue.")
             st.link_button("Renew License", "/buy")
             st.stop()
+    else:
+        st.stop()  # nothing below renders without a verified license
 
 # اگر اینجاییم یعنی لاگین OK
 ver = st.session_state.get("verified", {})
@@ -77,4 +87,24 @@ else:
 # TODO: محتوای اصلی داشبوردت
 # ----------------------------
 st.markdown("## Dashboard")
-st.write("Welcome! Your license is active. Put your charts and analytics here…")
+data = get_data()
+if data is None or data.frame.empty:
+    st.info("No sentiment data available yet.")
+    if last_error():
+        st.caption(f"Data source error: {last_error()}")
+    st.stop()
+
+st.caption(f"Latest day: {data.latest_day} • {len(data.frame)} rows • source: {data.source}")
+cols = st.columns(max(1, len(data.latest)))
+for col, (asset, value) in zip(cols, sorted(data.latest.items())):
+    col.metric(asset, f"{value:+.2f}")
+
+picked = st.multiselect("Assets", data.assets, default=data.assets)
+views = {"Daily mean": "avg_sentiment", "7-day mean": "mean_7d"}
+if "ewma" in data.frame:
+    views["EWMA"] = "ewma"
+if "conf_mean_7d" in data.frame:
+    views["7-day confidence-weighted"] = "conf_mean_7d"
+view = st.radio("Series", list(views), horizontal=True)
+if picked:
+    st.line_chart(data.wide(views[view], picked))
@@ -2,16 +2,21 @@
 # Minimal, production-safe Streamlit login using Google Apps Script licensing
 
 import os
+import sys
 import json
-import requests
 from datetime import datetime, timezone
+from pathlib import Path
 import streamlit as st
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))  # repo root, for `app.*`
+from app import http_client, license_store
+
 # --- Config via environment (Render -> Environment) ---
 GAS_URL   = os.environ.get("GOOGLE_SCRIPT_URL", "").strip()   # Your GAS Web App 'exec' URL
 GAS_TOKEN = os.environ.get("LICENSE_TOKEN", "").strip()       # Must match Code.gs token
 
 APP_NAME  = "AI Market Sentiment Pro"
+IDEMPOTENT_ACTIONS = {"verify"}  # safe for the shared client to retry
 
 # ---------- Utilities ----------
 def call_gas(action: str, extra: dict) -> dict:
@@ -24,12 +29,13 @@ def call_gas(action: str, extra: dict) -> dict:
         body.update(extra)
 
     try:
-        r = requests.post(
+        r = http_client.post(
             GAS_URL,
             data=json.dumps(body).encode("utf-8"),
             headers={"Content-Type": "application/json"},
             allow_redirects=True,
-            timeout=20,
+            endpoint=f"gas:{action}",
+            idempotent=action in IDEMPOTENT_ACTIONS,
         )
     except Exception as e:
         return {"ok": False, "error": f"request_failed: {e}"}
@@ -48,13 +54,18 @@ def call_gas(action: str, extra: dict) -> dict:
 
 
 def verify_license(email: str, license_key: str) -> dict:
-    """Calls GAS verify action -> expects {ok, plan, expires_at, days_left}."""
+    """Local license replica first, then the GAS verify action (see app/license_store.py)."""
     email = (email or "").strip().lower()
     license_key = (license_key or "").strip()
 
     if not email or not license_key:
         return {"ok": False, "error": "missing_credentials"}
 
+    return license_store.verify(email, license_key, _verify_remote, GAS_URL, GAS_TOKEN)
+
+
+def _verify_remote(email: str, license_key: str) -> dict:
+    """GAS verify -> {ok, plan, expires_at, days_left}."""
     resp = call_gas("verify", {"email": email, "license_key": license_key})
 
     if not resp.get("ok"):
@@ -0,0 +1,135 @@
+# app/columnar.py
+# Column-oriented sentiment history: one typed array per column instead of one
+# JSON object per row. Written by export_json.py, read by post_summary and the dashboards.
+#
+# JSON layout (all arrays little-endian, base64):
+#   {"format": "sentiment-columnar", "version": 1, "rows": N,
+#    "columns": {"day":           {"type": "date32",  "data": ...},   # days since 1970-01-01
+#                "asset":         {"type": "dict8",   "values": ["BTC", ...], "codes": ...},
+#                "avg_sentiment": {"type": "float32", "data": ...},
+#                "count_used":    {"type": "int32",   "data": ...}}}
+#
+# Parquet (same columns, asset dictionary-encoded) is written/read when pyarrow is installed.
+
+import base64
+import json
+from pathlib import Path
+from typing import Dict, Tuple, Union
+
+import numpy as np
+
+FORMAT = "sentiment-columnar"
+VERSION = 1
+COLUMNS = ("day", "asset", "avg_sentiment", "count_used")
+
+DTYPES = {"date32": "<i4", "dict8": "<u1", "float32": "<f4", "int32": "<i4"}
+EPOCH = np.datetime64("1970-01-01", "D")
+
+Columns = Dict[str, np.ndarray]
+
+def _b64(arr: np.ndarray, dtype: str) -> str:
+    return base64.b64encode(np.ascontiguousarray(arr, dtype=dtype).tobytes()).decode("ascii")
+
+def _unb64(data: str, dtype: str) -> np.ndarray:
+    # frombuffer views the decoded bytes directly; the arrays are read-only
+    return np.frombuffer(base64.b64decode(data), dtype=dtype)
+
+def encode(day, asset, avg_sentiment, count_used) -> dict:
+    """Build the columnar payload from four equal-length sequences (day as 'YYYY-MM-DD')."""
+    days = (np.asarray(day, dtype="datetime64[D]") - EPOCH).astype("<i4")
+    values, codes = np.unique(np.asarray(asset, dtype=object).astype(str), return_inverse=True)
+    if len(values) > 255:
+        raise ValueError(f"Too many assets for dict8 encoding: {len(values)}")
+    return {
+        "format": FORMAT,
+        "version": VERSION,
+        "rows": int(len(days)),
+        "columns": {
+            "day": {"type": "date32", "data": _b64(days, DTYPES["date32"])},
+            "asset": {"type": "dict8", "values": values.tolist(), "codes": _b64(codes, DTYPES["dict8"])},
+            "avg_sentiment": {"type": "float32", "data": _b64(avg_sentiment, DTYPES["float32"])},
+            "count_used": {"type": "int32", "data": _b64(count_used, DTYPES["int32"])},
+        },
+    }
+
+def dumps(payload: dict) -> bytes:
+    return json.dumps(payload, separators=(",", ":")).encode("utf-8")
+
+def is_columnar(payload) -> bool:
+    return isinstance(payload, dict) and payload.get("format") == FORMAT
+
+def decode(payload: dict) -> Columns:
+    """Columns as NumPy arrays; `asset` stays dictionary-encoded in `asset_codes` + `asset_values`."""
+    if not is_columnar(payload):
+        raise ValueError("Not a sentiment-columnar payload")
+    if payload.get("version") != VERSION:
+        raise ValueError(f"Unsupported columnar version: {payload.get('version')}")
+    cols = payload["columns"]
+    return {
+        "day": _unb64(cols["day"]["data"], DTYPES["date32"]).astype("datetime64[D]"),
+        "asset_codes": _unb64(cols["asset"]["codes"], DTYPES["dict8"]),
+        "asset_values": np.array(cols["asset"]["values"], dtype=object),
+        "avg_sentiment": _unb64(cols["avg_sentiment"]["data"], DTYPES["float32"]),
+        "count_used": _unb64(cols["count_used"]["data"], DTYPES["int32"]),
+    }
+
+# ---------- Parquet (optional pyarrow) ----------
+def write_parquet(path: Union[str, Path], day, asset, avg_sentiment, count_used):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    table = pa.table({
+        "day": pa.array(np.asarray(day, dtype="datetime64[D]")),
+        "asset": pa.array(list(asset)).dictionary_encode(),
+        "avg_sentiment": pa.array(np.asarray(avg_sentiment, dtype=np.float32)),
+        "count_used": pa.array(np.asarray(count_used, dtype=np.int32)),
+    })
+    pq.write_table(table, path, compression="zstd")
+
+def _read_parquet(source) -> Columns:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    table = pq.read_table(pa.BufferReader(source) if isinstance(source, bytes) else source)
+    asset = table.column("asset").combine_chunks()
+    if not pa.types.is_dictionary(asset.type):
+        asset = asset.dictionary_encode()
+    return {
+        "day": table.column("day").to_numpy().astype("datetime64[D]"),
+        "asset_codes": asset.indices.to_numpy(zero_copy_only=False).astype(np.uint8),
+        "asset_values": np.array(asset.dictionary.to_pylist(), dtype=object),
+        "avg_sentiment": table.column("avg_sentiment").to_numpy(),
+        "count_used": table.column("count_used").to_numpy(),
+    }
+
+# ---------- loaders ----------
+def load(source: Union[str, Path, bytes]) -> Columns:
+    """Columns from a columnar .json / .parquet path or its raw bytes."""
+    if isinstance(source, bytes):
+        if source[:4] == b"PAR1":
+            return _read_parquet(source)
+        return decode(json.loads(source))
+    path = Path(source)
+    if path.suffix == ".parquet":
+        return _read_parquet(str(path))
+    return decode(json.loads(path.read_bytes()))
+
+def to_frame(cols: Columns):
+    """pandas DataFrame with a categorical asset column (no per-row string objects)."""
+    import pandas as pd
+
+    return pd.DataFrame({
+        "day": cols["day"],
+        "asset": pd.Categorical.from_codes(cols["asset_codes"], categories=cols["asset_values"]),
+        "avg_sentiment": cols["avg_sentiment"],
+        "count_used": cols["count_used"],
+    })
+
+def latest_values(cols: Columns) -> Tuple[str, Dict[str, float]]:
+    """(latest day, {asset: avg_sentiment}) — what post_summary needs."""
+    if not len(cols["day"]):
+        raise ValueError("No rows in columnar payload")
+    last = cols["day"].max()
+    idx = np.flatnonzero(cols["day"] == last)
+    names = cols["asset_values"][cols["asset_codes"][idx]]
+    return str(last), {str(a).upper(): float(v) for a, v in zip(names, cols["avg_sentiment"][idx])}
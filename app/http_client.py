@@ -0,0 +1,242 @@
+# app/http_client.py
+# One shared HTTP client for the watcher, the Streamlit apps and the ETL.
+#
+#   - keep-alive: one requests.Session (own connection pool) per host, reused
+#     across calls and Streamlit sessions instead of a new TLS handshake each time
+#   - retries: jittered exponential backoff ("full jitter") on connection errors,
+#     timeouts and 429/5xx, for idempotent calls only. GET/HEAD are idempotent;
+#     a POST is retried only when the caller passes idempotent=True (Apps Script
+#     "verify" is, "issue license" is not). A POST that never reached the server
+#     (connect refused / connect timeout) is always safe to retry.
+#   - circuit breaker per host: after BREAKER_FAILURES consecutive failures calls
+#     fail fast with CircuitOpenError for BREAKER_RESET_SECONDS, then one trial
+#     call is let through (half-open); success closes the circuit again.
+#   - latency histogram per endpoint (label defaults to "METHOD host/path"):
+#     stats() / summary().
+#
+# Errors are the usual requests exceptions (CircuitOpenError is a
+# requests.ConnectionError), so existing `except Exception` handlers keep working.
+
+import os
+import random
+import threading
+import time
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+def _env_float(key: str, default: float) -> float:
+    try:
+        return float(os.environ.get(key, "").strip() or default)
+    except ValueError:
+        return default
+
+CONNECT_TIMEOUT = _env_float("HTTP_CONNECT_TIMEOUT", 5)
+READ_TIMEOUT = _env_float("HTTP_READ_TIMEOUT", 20)
+RETRIES = int(_env_float("HTTP_RETRIES", 2))            # extra attempts after the first
+BACKOFF_BASE = _env_float("HTTP_BACKOFF_BASE", 0.5)     # seconds; attempt n sleeps U(0, base * 2**n)
+BACKOFF_MAX = _env_float("HTTP_BACKOFF_MAX", 8)
+BREAKER_FAILURES = int(_env_float("HTTP_BREAKER_FAILURES", 5))
+BREAKER_RESET_SECONDS = _env_float("HTTP_BREAKER_RESET_SECONDS", 30)
+POOL_SIZE = 10  # connections kept per host
+
+RETRY_STATUS = {429, 500, 502, 503, 504}
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+BUCKETS_MS = (50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+
+class CircuitOpenError(requests.ConnectionError):
+    """The host had too many consecutive failures; the call was not attempted."""
+
+class _Breaker:
+    def __init__(self):
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.trial = False  # a half-open trial call is in flight
+
+    def state(self, now: float) -> str:
+        if self.opened_at is None:
+            return "closed"
+        return "half-open" if now - self.opened_at >= BREAKER_RESET_SECONDS else "open"
+
+class _Histogram:
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS_MS) + 1)
+        self.total = 0
+        self.errors = 0
+        self.retries = 0
+        self.sum_ms = 0.0
+        self.max_ms = 0.0
+
+    def observe(self, ms: float, ok: bool):
+        i = next((i for i, b in enumerate(BUCKETS_MS) if ms <= b), len(BUCKETS_MS))
+        self.counts[i] += 1
+        self.total += 1
+        self.errors += not ok
+        self.sum_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Upper bucket bound holding the q-th call (None = above the last bucket)."""
+        if not self.total:
+            return 0.0
+        seen = 0
+        for bound, n in zip(BUCKETS_MS + (None,), self.counts):
+            seen += n
+            if seen >= q * self.total:
+                return bound
+        return None
+
+class HttpClient:
+    def __init__(self, timeout=(CONNECT_TIMEOUT, READ_TIMEOUT), retries: int = RETRIES):
+        self.timeout = timeout
+        self.retries = retries
+        self._sessions: Dict[str, requests.Session] = {}
+        self._breakers: Dict[str, _Breaker] = {}
+        self._hist: Dict[str, _Histogram] = {}
+        self._lock = threading.Lock()
+
+    # ---------- internals ----------
+    def _session(self, host: str) -> requests.Session:
+        with self._lock:
+            s = self._sessions.get(host)
+            if s is None:
+                s = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=POOL_SIZE, max_retries=0)
+                s.mount("http://", adapter)
+                s.mount("https://", adapter)
+                self._sessions[host] = s
+            return s
+
+    def _admit(self, host: str):
+        with self._lock:
+            b = self._breakers.setdefault(host, _Breaker())
+            state = b.state(time.monotonic())
+            if state == "open" or (state == "half-open" and b.trial):
+                raise CircuitOpenError(f"circuit open for {host} after {b.failures} consecutive failures")
+            if state == "half-open":
+                b.trial = True
+
+    def _record(self, host: str, endpoint: str, ms: float, ok: bool, retried: bool):
+        with self._lock:
+            b = self._breakers[host]
+            b.trial = False
+            if ok:
+                b.failures, b.opened_at = 0, None
+            else:
+                b.failures += 1
+                if b.failures >= BREAKER_FAILURES or b.opened_at is not None:
+                    b.opened_at = time.monotonic()  # (re)open; a failed half-open trial restarts the cooldown
+            h = self._hist.setdefault(endpoint, _Histogram())
+            h.observe(ms, ok)
+            h.retries += retried
+
+    @staticmethod
+    def _never_sent(e: Exception) -> bool:
+        if isinstance(e, requests.ConnectTimeout):
+            return True
+        reason = getattr(e.args[0], "reason", None) if e.args else None
+        return type(reason).__name__ in ("NewConnectionError", "NameResolutionError")
+
+    @staticmethod
+    def _delay(attempt: int, resp: Optional[requests.Response]) -> float:
+        if resp is not None and resp.headers.get("Retry-After", "").strip().isdigit():
+            return min(float(resp.headers["Retry-After"]), BACKOFF_MAX)
+        return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+
+    # ---------- public ----------
+    def request(self, method: str, url: str, *, endpoint: Optional[str] = None,
+                idempotent: Optional[bool] = None, retries: Optional[int] = None,
+                **kwargs) -> requests.Response:
+        """requests.request() over the shared pool, with retry, breaker and latency stats.
+
+        A 429/5xx that survives all retries is returned as-is (call raise_for_status()).
+        """
+        method = method.upper()
+        parts = urlsplit(url)
+        host = parts.netloc
+        endpoint = endpoint or f"{method} {host}{parts.path}"
+        if idempotent is None:
+            idempotent = method in IDEMPOTENT_METHODS
+        retries = self.retries if retries is None else retries
+        kwargs.setdefault("timeout", self.timeout)
+        session = self._session(host)
+
+        attempt = 0
+        while True:
+            self._admit(host)
+            t0 = time.perf_counter()
+            resp, err = None, None
+            try:
+                resp = session.request(method, url, **kwargs)
+            except requests.RequestException as e:
+                err = e
+            ok = err is None and resp.status_code not in RETRY_STATUS
+            self._record(host, endpoint, (time.perf_counter() - t0) * 1000, ok, attempt > 0)
+            if ok:
+                return resp
+            transient = err is None or isinstance(err, (requests.ConnectionError, requests.Timeout))
+            retryable = transient and (idempotent or (err is not None and self._never_sent(err)))
+            if attempt >= retries or not retryable:
+                if err is not None:
+                    raise err
+                return resp
+            time.sleep(self._delay(attempt, resp))
+            attempt += 1
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request("POST", url, **kwargs)
+
+    def stats(self) -> dict:
+        """{"endpoints": {label: {...latency...}}, "hosts": {host: {state, failures}}}"""
+        now = time.monotonic()
+        with self._lock:
+            endpoints = {
+                label: {
+                    "count": h.total,
+                    "errors": h.errors,
+                    "retries": h.retries,
+                    "mean_ms": round(h.sum_ms / h.total, 1) if h.total else 0.0,
+                    "max_ms": round(h.max_ms, 1),
+                    "p50_ms": h.quantile(0.5),
+                    "p95_ms": h.quantile(0.95),
+                    "buckets": dict(zip([f"le_{b}" for b in BUCKETS_MS] + ["inf"], h.counts)),
+                }
+                for label, h in self._hist.items()
+            }
+            hosts = {host: {"state": b.state(now), "failures": b.failures}
+                     for host, b in self._breakers.items()}
+        return {"endpoints": endpoints, "hosts": hosts}
+
+    def summary(self) -> str:
+        s = self.stats()
+        lines = [f"{'endpoint':<40} {'n':>5} {'err':>4} {'retry':>5} {'mean_ms':>8} {'p95_ms':>7}"]
+        for label, e in sorted(s["endpoints"].items()):
+            p95 = ">30000" if e["p95_ms"] is None else e["p95_ms"]
+            lines.append(f"{label[:40]:<40} {e['count']:>5} {e['errors']:>4} {e['retries']:>5} "
+                         f"{e['mean_ms']:>8} {p95:>7}")
+        for host, h in sorted(s["hosts"].items()):
+            if h["state"] != "closed":
+                lines.append(f"circuit {h['state']}: {host} ({h['failures']} failures)")
+        return "\n".join(lines)
+
+CLIENT = HttpClient()
+
+def request(method: str, url: str, **kwargs) -> requests.Response:
+    return CLIENT.request(method, url, **kwargs)
+
+def get(url: str, **kwargs) -> requests.Response:
+    return CLIENT.get(url, **kwargs)
+
+def post(url: str, **kwargs) -> requests.Response:
+    return CLIENT.post(url, **kwargs)
+
+def stats() -> dict:
+    return CLIENT.stats()
+
+def summary() -> str:
+    return CLIENT.summary()
@@ -0,0 +1,127 @@
+# app/license_cache.py
+# Process-wide cache of license verification results for the Pro apps.
+#
+# Streamlit serves every session from one process, so reconnects and tabs that
+# log in together would otherwise each make their own Apps Script round trip.
+#
+#   - key: (scope, email, sha256(license_key)); the raw key is never stored
+#   - valid results live LICENSE_CACHE_TTL_SECONDS, but never past the start
+#     of their expires_at day (UTC), so an expiring license is re-checked
+#   - rejections (not found / expired) are remembered LICENSE_NEGATIVE_TTL_SECONDS,
+#     transport / server errors only ERROR_TTL_SECONDS
+#   - concurrent lookups of one key share a single fetch
+#
+# Results are returned as copies; callers may modify them.
+
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Callable, Dict, Optional, Tuple
+
+LICENSE_CACHE_TTL_SECONDS = float(os.environ.get("LICENSE_CACHE_TTL_SECONDS", "600"))
+LICENSE_NEGATIVE_TTL_SECONDS = float(os.environ.get("LICENSE_NEGATIVE_TTL_SECONDS", "60"))
+ERROR_TTL_SECONDS = 5
+MAX_ENTRIES = 10000
+FETCH_WAIT_SECONDS = 90  # followers give up waiting on a stuck leader after this
+
+# error strings the apps produce when GAS could not be asked, as opposed to a GAS "no"
+TRANSIENT_ERRORS = ("request_failed", "verify_failed", "bad_json", "bad_content_type",
+                    "http_", "server_misconfigured", "unknown_error")
+
+Key = Tuple[str, str, str]
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Optional[dict] = None
+        self.error: Optional[BaseException] = None
+
+_cache: "OrderedDict[Key, Tuple[float, dict]]" = OrderedDict()  # key -> (expires monotonic, result)
+_flights: Dict[Key, _Flight] = {}
+_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0, "coalesced": 0}
+
+def _key(email: str, license_key: str, scope: str) -> Key:
+    digest = hashlib.sha256((license_key or "").strip().encode("utf-8")).hexdigest()
+    return (scope, (email or "").strip(), digest)
+
+def _expires_in(expires_at) -> Optional[float]:
+    """Seconds until expires_at (a date means the start of that day, UTC); None if unparseable."""
+    try:
+        when = datetime.fromisoformat(str(expires_at).strip().replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return (when - datetime.now(timezone.utc)).total_seconds()
+
+def ttl_for(result: dict) -> float:
+    if result.get("ok"):
+        left = _expires_in(result.get("expires_at") or "")
+        return LICENSE_CACHE_TTL_SECONDS if left is None else max(0.0, min(LICENSE_CACHE_TTL_SECONDS, left))
+    err = str(result.get("error") or "").lower()
+    if not err or err.startswith(TRANSIENT_ERRORS):
+        return ERROR_TTL_SECONDS
+    return LICENSE_NEGATIVE_TTL_SECONDS
+
+def _store(key: Key, result: dict):
+    ttl = ttl_for(result)
+    if ttl <= 0:
+        return
+    _cache[key] = (time.monotonic() + ttl, result)
+    _cache.move_to_end(key)
+    while len(_cache) > MAX_ENTRIES:
+        _cache.popitem(last=False)
+
+def verify(email: str, license_key: str, fetch: Callable[[str, str], dict], scope: str = "") -> dict:
+    """fetch(email, license_key) through the cache; scope separates GAS deployments."""
+    key = _key(email, license_key, scope)
+    with _lock:
+        hit = _cache.get(key)
+        if hit is not None:
+            if hit[0] > time.monotonic():
+                _stats["hits"] += 1
+                return dict(hit[1])
+            del _cache[key]
+        flight = _flights.get(key)
+        leader = flight is None
+        if leader:
+            flight = _flights[key] = _Flight()
+            _stats["misses"] += 1
+        else:
+            _stats["coalesced"] += 1
+
+    if not leader:
+        if not flight.done.wait(FETCH_WAIT_SECONDS):
+            return {"ok": False, "error": "verify_failed: timed out waiting for license check"}
+        if flight.error is not None:
+            raise flight.error
+        return dict(flight.result)
+
+    try:
+        flight.result = fetch(email, license_key)
+        with _lock:
+            _store(key, flight.result)
+        return dict(flight.result)
+    except BaseException as e:
+        flight.error = e
+        raise
+    finally:
+        with _lock:
+            _flights.pop(key, None)
+        flight.done.set()
+
+def invalidate(email: str, license_key: str, scope: str = ""):
+    with _lock:
+        _cache.pop(_key(email, license_key, scope), None)
+
+def clear():
+    with _lock:
+        _cache.clear()
+
+def stats() -> dict:
+    with _lock:
+        return {**_stats, "entries": len(_cache)}
@@ -0,0 +1,231 @@
+# app/license_store.py
+# Local SQLite replica of the license sheet, so verify_license answers without
+# an Apps Script round trip and keeps working while GAS is slow or down.
+#
+#   - delta sync: GET {url}?licenses=1&since=<cursor>&secret=<token> returns
+#     {"ok": true, "rows": [{email, license_key, plan, expires_at, status,
+#     updated_at}, ...], "cursor": "<max updated_at>", "more": bool}; rows are
+#     upserted and the cursor is kept in license_meta. Syncs run in the
+#     background, at most every LICENSE_SYNC_SECONDS; logins never wait on one.
+#   - write-through: the watcher records every license GAS accepted (record_issued).
+#     That only reaches apps reading the same LICENSE_DB file; on separate hosts
+#     (Actions runner vs. Render) the apps see new keys via sync or the GAS fallback.
+#   - only sha256(license_key) is stored
+#   - bounded trust: synced rows are served only while the last successful sync
+#     is younger than LICENSE_MAX_STALE_SECONDS (revocations arrive by sync);
+#     rows learned from a GAS verify or the watcher only for LICENSE_LOCAL_TTL_SECONDS
+#
+# verify() returns None when the replica doesn't know the (email, key) pair;
+# callers then ask GAS, so keys added after the last sync still work.
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from datetime import date, datetime
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+
+import storage
+from storage import NOW_SQL, write_txn
+
+LICENSE_DB = os.environ.get("LICENSE_DB", ".state/licenses.db").strip()
+LICENSE_SYNC_SECONDS = float(os.environ.get("LICENSE_SYNC_SECONDS", "60"))
+LICENSE_MAX_STALE_SECONDS = float(os.environ.get("LICENSE_MAX_STALE_SECONDS", "900"))
+LICENSE_LOCAL_TTL_SECONDS = float(os.environ.get("LICENSE_LOCAL_TTL_SECONDS", "600"))
+SYNC_MAX_PAGES = 50
+
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS licenses (
+    email TEXT NOT NULL,
+    key_hash TEXT NOT NULL,
+    plan TEXT,
+    expires_at TEXT,
+    status TEXT,
+    updated_at TEXT,              -- sheet's updated_at (sync cursor domain)
+    source TEXT,                  -- sync | issued | verify
+    stored_at TEXT DEFAULT ({NOW_SQL}),
+    PRIMARY KEY (email, key_hash)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS license_meta (key TEXT PRIMARY KEY, value TEXT);
+"""
+
+def key_hash(license_key: str) -> str:
+    return hashlib.sha256((license_key or "").strip().encode("utf-8")).hexdigest()
+
+def _norm_email(email: str) -> str:
+    return (email or "").strip().lower()
+
+def _expiry_date(expires_at) -> Optional[date]:
+    try:
+        return datetime.fromisoformat(str(expires_at).strip()[:10]).date()
+    except ValueError:
+        return None
+
+class LicenseStore:
+    def __init__(self, path: str = LICENSE_DB, url: str = "", token: str = ""):
+        self.path = path
+        self.url = url
+        self.token = token
+        self._local = threading.local()
+        self._sync_lock = threading.Lock()
+        self._synced_at = 0.0
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn().executescript(SCHEMA)
+
+    def _conn(self) -> sqlite3.Connection:
+        # Streamlit sessions are threads; sqlite3 connections are per thread
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = storage.connect(self.path)
+        return conn
+
+    def meta(self, key: str) -> Optional[str]:
+        row = self._conn().execute("SELECT value FROM license_meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    # ---------- reads ----------
+    def verify(self, email: str, license_key: str) -> Optional[dict]:
+        """GAS-shaped verify answer from the replica; None if the pair isn't known locally."""
+        self.maybe_sync()
+        conn = self._conn()
+        row = conn.execute(f"""
+            SELECT plan, expires_at, status, source,
+                   stored_at >= strftime('%Y-%m-%dT%H:%M:%f', 'now', '-{LICENSE_LOCAL_TTL_SECONDS} seconds')
+            FROM licenses WHERE email = ? AND key_hash = ?
+            """, (_norm_email(email), key_hash(license_key))).fetchone()
+        if row is None:
+            return None
+        plan, expires_at, status, source, recent = row
+        if source == "sync":
+            fresh = conn.execute(f"""
+                SELECT value >= strftime('%Y-%m-%dT%H:%M:%f', 'now', '-{LICENSE_MAX_STALE_SECONDS} seconds')
+                FROM license_meta WHERE key = 'synced_at'
+                """).fetchone()
+            if not (fresh and fresh[0]):
+                return None  # sync endpoint missing or failing: a revocation may not have arrived
+        elif not recent:
+            return None
+        if (status or "active").lower() != "active":
+            return {"ok": False, "error": f"not_active: {status}"}
+        expiry = _expiry_date(expires_at)
+        if expiry is None:
+            return None  # can't judge locally
+        days_left = (expiry - date.today()).days
+        if days_left < 0:
+            return {"ok": False, "error": "expired", "plan": plan, "expires_at": expires_at}
+        return {"ok": True, "plan": plan, "expires_at": expires_at, "days_left": days_left, "source": "replica"}
+
+    # ---------- writes ----------
+    def upsert(self, rows: Iterable[dict], source: str) -> int:
+        params = [(_norm_email(r.get("email")), r.get("key_hash") or key_hash(r.get("license_key")),
+                   r.get("plan"), r.get("expires_at"), r.get("status") or "active",
+                   r.get("updated_at"), source)
+                  for r in rows if r.get("email") and (r.get("key_hash") or r.get("license_key"))]
+        if not params:
+            return 0
+        conn = self._conn()
+        with write_txn(conn):
+            conn.executemany(f"""
+            INSERT INTO licenses (email, key_hash, plan, expires_at, status, updated_at, source)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (email, key_hash) DO UPDATE SET
+                plan = excluded.plan, expires_at = excluded.expires_at, status = excluded.status,
+                updated_at = COALESCE(excluded.updated_at, licenses.updated_at),
+                source = excluded.source, stored_at = {NOW_SQL}
+            """, params)
+        return len(params)
+
+    def record_issued(self, email: str, license_key: str, plan: str, expires_at: str, status: str = "active"):
+        self.upsert([{"email": email, "license_key": license_key, "plan": plan,
+                      "expires_at": expires_at, "status": status}], "issued")
+
+    # ---------- delta sync ----------
+    def sync(self) -> int:
+        """Pull rows changed since the stored cursor. Returns the number of rows applied."""
+        from app import http_client
+
+        if not (self.url and self.token):
+            return 0
+        conn = self._conn()
+        cursor = self.meta("cursor") or ""
+        applied = 0
+        for _ in range(SYNC_MAX_PAGES):
+            r = http_client.get(self.url, params={"licenses": 1, "since": cursor, "secret": self.token},
+                                endpoint="gas:licenses")
+            r.raise_for_status()
+            j = r.json()
+            if not j.get("ok"):
+                raise RuntimeError(f"license sync rejected: {j.get('error')}")
+            rows = j.get("rows") or []
+            applied += self.upsert(rows, "sync")
+            new_cursor = j.get("cursor") or max((str(x.get("updated_at") or "") for x in rows), default="")
+            with write_txn(conn):
+                if new_cursor and new_cursor > cursor:
+                    conn.execute("INSERT OR REPLACE INTO license_meta VALUES ('cursor', ?)", (new_cursor,))
+                conn.execute(f"INSERT OR REPLACE INTO license_meta VALUES ('synced_at', {NOW_SQL})")
+            if not j.get("more") or not rows or new_cursor <= cursor:
+                break
+            cursor = new_cursor
+        self._synced_at = time.monotonic()
+        return applied
+
+    def maybe_sync(self):
+        """Start a background sync if the last one is older than LICENSE_SYNC_SECONDS.
+
+        Never blocks: until the first sync lands, verify() misses and callers ask GAS.
+        """
+        if not (self.url and self.token) or time.monotonic() - self._synced_at < LICENSE_SYNC_SECONDS:
+            return
+        if not self._sync_lock.acquire(blocking=False):
+            return  # a sync is already running
+
+        def run():
+            try:
+                n = self.sync()
+                if n:
+                    print(f"license replica: {n} row(s) synced")
+            except Exception as e:
+                self._synced_at = time.monotonic()  # back off a full interval
+                print(f"WARN: license sync failed: {type(e).__name__}: {e}")
+            finally:
+                self._sync_lock.release()
+
+        threading.Thread(target=run, name="license-sync", daemon=True).start()
+
+_STORES: Dict[tuple, LicenseStore] = {}
+_STORES_LOCK = threading.Lock()
+
+def get_store(url: str = "", token: str = "", path: str = LICENSE_DB) -> LicenseStore:
+    """The process-wide store for (path, url)."""
+    with _STORES_LOCK:
+        store = _STORES.get((path, url))
+        if store is None:
+            store = _STORES[(path, url)] = LicenseStore(path, url, token)
+        return store
+
+def verify(email: str, license_key: str, remote, url: str, token: str, path: str = LICENSE_DB) -> dict:
+    """Replica first; on a miss remote(email, license_key) through license_cache.
+
+    A valid remote answer is written back, so the next check of that key is local.
+    A broken replica only costs the local fast path.
+    """
+    from app import license_cache
+
+    store = None
+    try:
+        store = get_store(url, token, path)
+        local = store.verify(email, license_key)
+        if local is not None:
+            return local
+    except Exception as e:
+        print(f"WARN: license replica unavailable: {type(e).__name__}: {e}")
+    resp = license_cache.verify(email, license_key, remote, scope=url)
+    if resp.get("ok") and store is not None:
+        try:
+            store.upsert([{"email": email, "license_key": license_key, "plan": resp.get("plan"),
+                           "expires_at": resp.get("expires_at"), "status": "active"}], "verify")
+        except Exception as e:
+            print(f"WARN: license replica write failed: {type(e).__name__}: {e}")
+    return resp
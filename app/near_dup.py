@@ -0,0 +1,84 @@
+# app/near_dup.py
+# 64-bit SimHash over normalized headline + summary text, for spotting the same
+# wire story republished with small wording changes. Copies of one story land a
+# few bits apart; unrelated headlines differ in ~half of the 64 bits.
+#
+# A SimHash hit is only a candidate: a headline with one word flipped ("rise" ->
+# "fall") can be as close as a real copy, so callers confirm with same_story().
+
+import hashlib
+import html
+import re
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+BITS = 64
+MIN_TOKENS = 6  # shorter texts are too generic to fingerprint ("Bitcoin rallies")
+
+_TAG = re.compile(r"<[^>]+>")
+_WORD = re.compile(r"[a-z0-9$%&]+(?:['.][a-z0-9]+)*")
+# publisher tails like "- Reuters" / "| FXStreet" differ between copies of one story
+_SOURCE_TAIL = re.compile(r"\s[-|–—]\s[^-|–—]{1,40}$")
+
+def normalize(title: str, summary: str = "") -> List[str]:
+    title = _SOURCE_TAIL.sub("", html.unescape(str(title or "")).strip())
+    text = f"{title} {_TAG.sub(' ', html.unescape(str(summary or '')))}".lower()
+    return _WORD.findall(text)
+
+def simhashes(docs: Sequence[Tuple[str, str]]) -> List[Optional[int]]:
+    """Unsigned 64-bit fingerprints for (title, summary) pairs; None where the text is too short.
+
+    Each distinct word of the batch is hashed once; every fingerprint bit is the
+    majority vote of that bit over the hashes of the document's words.
+    """
+    vocab: Dict[str, int] = {}
+    rows = []
+    for title, summary in docs:
+        words = set(normalize(title, summary))
+        rows.append([vocab.setdefault(w, len(vocab)) for w in words] if len(words) >= MIN_TOKENS else None)
+    out: List[Optional[int]] = [None] * len(rows)
+    keep = [i for i, r in enumerate(rows) if r]
+    if not keep:
+        return out
+    hashes = np.array([int.from_bytes(hashlib.blake2b(w.encode("utf-8"), digest_size=8).digest(), "big")
+                       for w in vocab], dtype="<u8")
+    signs = np.unpackbits(hashes.view(np.uint8)).reshape(len(vocab), BITS).astype(np.int16) * 2 - 1
+    lengths = np.array([len(rows[i]) for i in keep])
+    starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    votes = np.add.reduceat(signs[np.concatenate([rows[i] for i in keep])], starts, axis=0)
+    fps = np.packbits(votes > 0, axis=1).view(">u8").ravel()
+    for i, fp in zip(keep, fps.tolist()):
+        out[i] = fp
+    return out
+
+def simhash(title: str, summary: str = "") -> Optional[int]:
+    return simhashes([(title, summary)])[0]
+
+def jaccard(a: Set[str], b: Set[str]) -> float:
+    return len(a & b) / len(a | b) if a or b else 1.0
+
+def same_story(tokens_a: Set[str], hits_a: frozenset, tokens_b: Set[str], hits_b: frozenset,
+               min_jaccard: float) -> bool:
+    """Exact check behind a SimHash candidate: near-identical wording and identical
+    sentiment-bearing terms (same lexicon hits, same negation)."""
+    return hits_a == hits_b and jaccard(tokens_a, tokens_b) >= min_jaccard
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+def distances(fp: int, others: Sequence[int]) -> np.ndarray:
+    """Bit distance from fp to each fingerprint in others, vectorized."""
+    if not len(others):
+        return np.zeros(0, dtype=np.int64)
+    xor = np.asarray(others, dtype=np.uint64) ^ np.uint64(fp)
+    if hasattr(np, "bitwise_count"):  # NumPy >= 2.0
+        return np.bitwise_count(xor)
+    return np.unpackbits(xor.view(np.uint8)).reshape(len(xor), BITS).sum(axis=1)
+
+# SQLite INTEGER is signed 64-bit
+def to_signed(fp: int) -> int:
+    return fp - (1 << BITS) if fp >= 1 << (BITS - 1) else fp
+
+def to_unsigned(value: int) -> int:
+    return value & ((1 << BITS) - 1)
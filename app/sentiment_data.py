@@ -0,0 +1,179 @@
+# app/sentiment_data.py
+# Shared, process-wide sentiment history for the Streamlit apps.
+#
+# Streamlit reruns the page script on every interaction and runs sessions as
+# threads of one process, so the parsed data lives here at module level: one
+# copy per process, revalidated at most every DATA_TTL_SECONDS.
+#
+#   - remote (DATA_URL): conditional GET with ETag / Last-Modified; a 200 whose
+#     body hashes the same as the cached copy is not parsed again. Row JSON,
+#     columnar JSON and Parquet (export_json.py) are all accepted.
+#   - local (SENTIMENT_DB): read straight from sentiment.db, including the
+#     sentiments_rolling columns; revalidated by MAX(updated_at).
+#
+# The frames handed out are shared between sessions: treat them as read-only.
+
+import hashlib
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+from app import columnar, http_client
+
+DATA_URL = os.environ.get("DATA_URL", "").strip()
+SENTIMENT_DB = os.environ.get("SENTIMENT_DB", "").strip()
+DATA_TTL_SECONDS = float(os.environ.get("DATA_TTL_SECONDS", "300"))
+RETRY_SECONDS = 30  # after a failed refresh, wait this long (at most ttl) before trying again
+
+ROLLING_COLUMNS = ["mean_7d", "mean_30d", "ewma", "conf_mean_7d"]
+
+@dataclass(frozen=True)
+class SentimentData:
+    frame: pd.DataFrame                   # day, asset, avg_sentiment, count_used (+ rolling columns)
+    series: Dict[str, pd.DataFrame]       # asset -> frame indexed by day
+    latest_day: Optional[str]
+    latest: Dict[str, float]              # asset -> avg_sentiment on latest_day
+    version: str                          # ETag / content hash / DB watermark
+    source: str
+    loaded_at: float = field(default_factory=time.time)
+
+    @property
+    def assets(self) -> List[str]:
+        return sorted(self.series)
+
+    def wide(self, column: str = "avg_sentiment", assets: Optional[List[str]] = None) -> pd.DataFrame:
+        """day x asset table of one column, ready for st.line_chart."""
+        picked = assets or self.assets
+        return pd.DataFrame({a: self.series[a][column] for a in picked if column in self.series[a]})
+
+def build(df: pd.DataFrame, version: str, source: str) -> SentimentData:
+    df = df.copy()
+    df["day"] = pd.to_datetime(df["day"])
+    df["asset"] = df["asset"].astype(str).str.upper()
+    df = df.sort_values(["asset", "day"], kind="stable").reset_index(drop=True)
+    series = {}
+    for asset, g in df.groupby("asset", sort=True):
+        s = g.drop(columns="asset").set_index("day")
+        if "mean_7d" not in s:
+            # count-weighted calendar window, same definition as sentiments_rolling
+            w = (s["avg_sentiment"] * s["count_used"]).rolling("7D").sum()
+            s["mean_7d"] = w / s["count_used"].rolling("7D").sum()
+        series[asset] = s
+    latest_day, latest = None, {}
+    if not df.empty:
+        last = df["day"].max()
+        latest_day = last.strftime("%Y-%m-%d")
+        today = df[df["day"] == last]
+        latest = dict(zip(today["asset"], today["avg_sentiment"].astype(float)))
+    return SentimentData(df, series, latest_day, latest, version, source)
+
+def _frame_from_payload(raw: bytes) -> pd.DataFrame:
+    if raw[:4] == b"PAR1":
+        return columnar.to_frame(columnar.load(raw))
+    payload = json.loads(raw.decode("utf-8", "ignore"))
+    if columnar.is_columnar(payload):
+        return columnar.to_frame(columnar.decode(payload))
+    if isinstance(payload, dict):  # latest.json style {"day": ..., "BTC": 0.1, ...}
+        payload = [{"day": payload.get("day"), "asset": k, "avg_sentiment": v,
+                    "count_used": payload.get("counts", {}).get(k, 0)}
+                   for k, v in payload.items() if k not in ("day", "counts")]
+    return pd.DataFrame(payload, columns=["day", "asset", "avg_sentiment", "count_used"])
+
+class _Entry:
+    def __init__(self):
+        self.data: Optional[SentimentData] = None
+        self.validators: Dict[str, str] = {}
+        self.checked_at = 0.0
+        self.error: Optional[str] = None
+        self.lock = threading.Lock()
+
+    def fresh(self, ttl: float) -> bool:
+        max_age = ttl if self.error is None else min(ttl, RETRY_SECONDS)
+        return time.time() - self.checked_at < max_age
+
+_ENTRIES: Dict[str, _Entry] = {}
+_ENTRIES_LOCK = threading.Lock()
+
+def _entry(key: str) -> _Entry:
+    with _ENTRIES_LOCK:
+        return _ENTRIES.setdefault(key, _Entry())
+
+def _refresh_url(entry: _Entry, url: str):
+    headers = {}
+    if entry.data is not None:
+        if entry.validators.get("etag"):
+            headers["If-None-Match"] = entry.validators["etag"]
+        if entry.validators.get("modified"):
+            headers["If-Modified-Since"] = entry.validators["modified"]
+    r = http_client.get(url, headers=headers, endpoint="sentiment_data")
+    if r.status_code == 304 and entry.data is not None:
+        return
+    r.raise_for_status()
+    entry.validators = {"etag": r.headers.get("ETag"), "modified": r.headers.get("Last-Modified")}
+    digest = hashlib.sha256(r.content).hexdigest()
+    if entry.data is not None and entry.data.version == digest:
+        return  # same bytes behind a new ETag (e.g. a re-push): keep the parsed copy
+    entry.data = build(_frame_from_payload(r.content), digest, url)
+
+def _refresh_db(entry: _Entry, path: str):
+    import storage
+
+    conn = storage.connect(path, readonly=True)
+    try:
+        version = "|".join(map(str, conn.execute(
+            "SELECT MAX(updated_at), COUNT(*) FROM sentiments_daily").fetchone()))
+        if entry.data is not None and entry.data.version == version:
+            return
+        has_rolling = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sentiments_rolling'").fetchone()
+        if has_rolling:
+            cols = ", ".join(f"r.{c}" for c in ROLLING_COLUMNS)
+            q = f"""
+            SELECT d.day, d.asset, d.avg_sentiment, d.count_used, {cols}
+            FROM sentiments_daily d LEFT JOIN sentiments_rolling r ON r.day = d.day AND r.asset = d.asset
+            """
+        else:
+            q = "SELECT day, asset, avg_sentiment, count_used FROM sentiments_daily"
+        df = pd.read_sql_query(q, conn)
+    finally:
+        conn.close()
+    entry.data = build(df, version, path)
+
+def get_data(url: str = DATA_URL, db_path: str = SENTIMENT_DB,
+             ttl: float = DATA_TTL_SECONDS) -> Optional[SentimentData]:
+    """The shared SentimentData, revalidated when older than ttl; None if nothing could be loaded.
+
+    A local db_path wins over url. On a failed refresh the last good copy is kept.
+    Only one thread revalidates at a time; the others wait for its result.
+    """
+    local = bool(db_path) and Path(db_path).exists()
+    key = f"db:{db_path}" if local else f"url:{url}"
+    if not local and not url:
+        return None
+    entry = _entry(key)
+    if entry.fresh(ttl):
+        return entry.data
+    with entry.lock:
+        if entry.fresh(ttl):
+            return entry.data  # another session refreshed while we waited
+        try:
+            if local:
+                _refresh_db(entry, db_path)
+            else:
+                _refresh_url(entry, url)
+            entry.error = None
+        except Exception as e:
+            entry.error = f"{type(e).__name__}: {e}"
+            print(f"WARN: sentiment data refresh failed ({key}): {entry.error}")
+        entry.checked_at = time.time()
+    return entry.data
+
+def last_error(url: str = DATA_URL, db_path: str = SENTIMENT_DB) -> Optional[str]:
+    local = bool(db_path) and Path(db_path).exists()
+    return _entry(f"db:{db_path}" if local else f"url:{url}").error
@@ -1,6 +1,11 @@
-from typing import List
+from typing import Dict, Iterable, List, Union
+from itertools import repeat
 import string  # ✅ برای حذف علائم نگارشی بدون دردسر کوتیشن‌ها
 
+import numpy as np
+
+LEXICON_VERSION = "2"  # bump whenever terms, weights or scoring rules change
+
 POSITIVE = {
     "optimism","optimistic","bull","bullish","rally","gain","up","surge","approve",
     "improve","positive","growth","strong","breakout","support","recover","rise",
@@ -13,16 +18,109 @@ NEGATIVE = {
     "correction","pressure"
 }
 
+# A negator flips the lexicon terms in the NEGATION_WINDOW words that follow it.
+NEGATORS = {
+    "not","no","never","without","hardly","nor","cannot","isn't","aren't","wasn't",
+    "weren't","don't","doesn't","didn't","won't","can't"
+}
+NEGATION_WINDOW = 3
+
+Lexicon = Union[Iterable[str], Dict[str, float]]
+
+def _weights(terms: Lexicon) -> Dict[str, float]:
+    if isinstance(terms, dict):
+        return {str(t).lower(): float(w) for t, w in terms.items()}
+    return {str(t).lower(): 1.0 for t in terms}
+
+_PUNCT = "".join(c for c in string.punctuation if c not in "'-")
+_PUNCT_TO_SPACE = str.maketrans({c: " " for c in _PUNCT})
+
+class LexiconScorer:
+    """Batch lexicon scorer.
+
+    A whole batch is lowercased, stripped of punctuation and split in one go
+    (str.translate/str.split run in C); tokens are mapped to integer ids with a
+    single dict pass and everything after that is NumPy.
+
+    Like the original word-set scorer, each distinct term counts once per text:
+    score = (P - N) / (P + N), with P and N the summed weights of distinct
+    positive and negative hits. A term within `negation_window` words after a
+    negator swaps sides.
+    """
+
+    _SEP = "\x00"
+    _SEP_ID, _NEG_ID, _OTHER_ID = -2, -3, -1
+
+    def __init__(self, positive: Lexicon = POSITIVE, negative: Lexicon = NEGATIVE,
+                 negators: Iterable[str] = NEGATORS, negation_window: int = NEGATION_WINDOW):
+        pos, neg = _weights(positive), _weights(negative)
+        self.terms = sorted(set(pos) | set(neg))
+        self.polarity = np.array([pos.get(t, 0.0) - neg.get(t, 0.0) for t in self.terms], dtype=np.float64)
+        self.negation_window = negation_window
+        # quotes/hyphens survive tokenizing ("don't", "risk-off"), so edge variants
+        # like "'rally'" or "rally-" are registered as the same id
+        self.vocab = {}
+        ids = [(t, i) for i, t in enumerate(self.terms)] + [(w.lower(), self._NEG_ID) for w in negators]
+        for w, i in ids:
+            for pre in ("", "'", "-"):
+                for suf in ("", "'", "-"):
+                    self.vocab.setdefault(pre + w + suf, i)
+        self.vocab[self._SEP] = self._SEP_ID
+
+    def tokenize(self, texts: List[str]) -> List[str]:
+        blob = (" " + f" {self._SEP} ".join(t if isinstance(t, str) else "" for t in texts)
+                + f" {self._SEP} ").lower().translate(_PUNCT_TO_SPACE)
+        return blob.split()
+
+    def score(self, texts: List[str]) -> np.ndarray:
+        n = len(texts)
+        out = np.zeros(n, dtype=np.float64)
+        if n == 0:
+            return out
+        tokens = self.tokenize(texts)
+        codes = np.fromiter(map(self.vocab.get, tokens, repeat(self._OTHER_ID)), dtype=np.int64, count=len(tokens))
+        is_sep = codes == self._SEP_ID
+        if int(is_sep.sum()) != n:  # a text contained the separator itself
+            return np.array([self.score([t])[0] for t in texts]) if n > 1 else out
+        idx = np.arange(codes.size)
+        last_sep = np.maximum.accumulate(np.where(is_sep, idx, -1))
+        last_neg = np.maximum.accumulate(np.where(codes == self._NEG_ID, idx, -1))
+        negated = (last_neg > last_sep) & (idx - last_neg <= self.negation_window)
+        doc = np.cumsum(is_sep)
+        hit = codes >= 0
+        if not hit.any():
+            return out
+        width = 2 * len(self.terms)
+        keys = np.sort(doc[hit] * width + codes[hit] * 2 + negated[hit])
+        keys = keys[np.concatenate(([True], keys[1:] != keys[:-1]))]
+        doc, code = np.divmod(keys, width)
+        w = self.polarity[code >> 1] * np.where(code & 1, -1.0, 1.0)
+        p = np.bincount(doc, weights=np.clip(w, 0, None), minlength=n)
+        q = np.bincount(doc, weights=np.clip(-w, 0, None), minlength=n)
+        tot = p + q
+        np.divide(p - q, tot, out=out, where=tot > 0)
+        return out
+
+    def hits(self, text: str) -> frozenset:
+        """Distinct (term, negated) lexicon hits of one text, i.e. what score() counts."""
+        out, last_neg = set(), None
+        for i, tok in enumerate(self.tokenize([text])[:-1]):  # drop the trailing separator
+            code = self.vocab.get(tok, self._OTHER_ID)
+            if code == self._NEG_ID:
+                last_neg = i
+            elif code >= 0:
+                out.add((self.terms[code], last_neg is not None and i - last_neg <= self.negation_window))
+        return frozenset(out)
+
+DEFAULT_SCORER = LexiconScorer()
+
+def score_batch(texts: List[str]) -> np.ndarray:
+    return DEFAULT_SCORER.score(texts)
+
 def score_text(text: str) -> float:
     if not text:
         return 0.0
-    # ✅ بدون کوتیشن‌های دردسرساز: همه‌ی علائم نگارشی استاندارد
-    words = {w.strip(string.punctuation).lower() for w in text.split()}
-    pos = len(words & POSITIVE)
-    neg = len(words & NEGATIVE)
-    if pos == 0 and neg == 0:
-        return 0.0
-    return (pos - neg) / max(1, pos + neg)
+    return float(DEFAULT_SCORER.score([text])[0])
 
 def score_texts(texts: List[str]) -> List[float]:
-    return [score_text(t) for t in texts]
+    return DEFAULT_SCORER.score(list(texts)).tolist()
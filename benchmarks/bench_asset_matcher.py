@@ -0,0 +1,57 @@
+# benchmarks/bench_asset_matcher.py
+# Micro-benchmark: AssetMatcher vs the old per-keyword `kw in text` loop.
+# Run from the repo root: python -m benchmarks.bench_asset_matcher [--rows N]
+
+import argparse
+import random
+import time
+
+from etl_to_sqlite import ASSET_KEYWORDS, ASSET_MATCHER
+
+HEADLINES = [
+    "Bitcoin rallies as ETF optimism grows",
+    "Gold slips amid stronger dollar as greenback firms",
+    "Brent crude rises on supply concerns",
+    "US stocks close higher; S&P 500 hits record",
+    "Ethereum upgrade boosts scalability",
+    "EUR/USD steadies ahead of ECB decision",
+    "Markets in turmoil as bond yields jump",
+    "Central bank keeps rates unchanged, outlook uncertain",
+]
+
+def legacy_infer_asset(title: str, summary: str):
+    text = f"{title} {summary}".lower()
+    for asset, kws in ASSET_KEYWORDS.items():
+        if any(kw in text for kw in kws):
+            return asset
+    return None
+
+def legacy_all_assets(title: str, summary: str):
+    text = f"{title} {summary}".lower()
+    return [a for a, kws in ASSET_KEYWORDS.items() if any(kw in text for kw in kws)]
+
+def make_texts(n: int, seed: int = 7) -> list[str]:
+    rnd = random.Random(seed)
+    return [f"{rnd.choice(HEADLINES)} {rnd.choice(HEADLINES).lower()}" for _ in range(n)]
+
+def timed(fn, texts) -> float:
+    t0 = time.perf_counter()
+    for t in texts:
+        fn(t, "")
+    return time.perf_counter() - t0
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=100_000)
+    args = ap.parse_args()
+    texts = make_texts(args.rows)
+    legacy = timed(legacy_infer_asset, texts)
+    legacy_all = timed(legacy_all_assets, texts)
+    matcher = timed(lambda t, s: ASSET_MATCHER.match(f"{t} {s}"), texts)
+    print(f"rows={args.rows}")
+    print(f"legacy loop  : {legacy:.3f}s  ({args.rows / legacy:,.0f} rows/s, first asset only)")
+    print(f"legacy (all) : {legacy_all:.3f}s  ({args.rows / legacy_all:,.0f} rows/s, all assets, no counts)")
+    print(f"AssetMatcher : {matcher:.3f}s  ({args.rows / matcher:,.0f} rows/s, all assets + counts)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+# benchmarks/bench_lexicon.py
+# Throughput of the batch lexicon scorer vs the old per-text word-set loop.
+# Run from the repo root: python -m benchmarks.bench_lexicon [--rows N]
+
+import argparse
+import random
+import string
+import time
+
+from app.sentiment_lexicon import NEGATIVE, POSITIVE, score_batch
+
+FILLER = ("the market today traders said investors price shares bank rates central "
+          "policy outlook quarter earnings analysts week amid after as on for of").split()
+
+def legacy_score_text(text: str) -> float:
+    if not text:
+        return 0.0
+    words = {w.strip(string.punctuation).lower() for w in text.split()}
+    pos = len(words & POSITIVE)
+    neg = len(words & NEGATIVE)
+    if pos == 0 and neg == 0:
+        return 0.0
+    return (pos - neg) / max(1, pos + neg)
+
+def make_texts(n: int, seed: int = 7) -> list[str]:
+    rnd = random.Random(seed)
+    terms = sorted(POSITIVE | NEGATIVE)
+    out = []
+    for _ in range(n):
+        words = [rnd.choice(FILLER) for _ in range(rnd.randint(10, 30))]
+        for _ in range(rnd.randint(0, 3)):
+            words.insert(rnd.randrange(len(words)), rnd.choice(terms))
+        if rnd.random() < 0.1:
+            words.insert(rnd.randrange(len(words)), "not")
+        out.append(" ".join(words).capitalize() + ".")
+    return out
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=100_000)
+    args = ap.parse_args()
+    texts = make_texts(args.rows)
+    t0 = time.perf_counter()
+    for t in texts:
+        legacy_score_text(t)
+    legacy = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    score_batch(texts)
+    batch = time.perf_counter() - t0
+    print(f"rows={args.rows}")
+    print(f"legacy loop  : {legacy:.3f}s  ({args.rows / legacy:,.0f} texts/s)")
+    print(f"score_batch  : {batch:.3f}s  ({args.rows / batch:,.0f} texts/s)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+# benchmarks/bench_startup.py
+# Cold-start wall time of etl_to_sqlite entry points, each in a fresh interpreter,
+# and which heavy modules each one ended up importing.
+# Run from the repo root: python -m benchmarks.bench_startup [--repeat N]
+
+import argparse
+import json
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+HEAVY = ("pandas", "torch", "transformers", "feedparser", "requests")
+
+# each runs inside SCRIPT with a fresh temp DB; RSS is off so only local work is timed
+SCENARIOS = {
+    "import": "pass",
+    "aggregate_only": "etl.main(['--aggregate-only'])",
+    "lexicon_csv": "etl.main(['--scorer', 'lexicon'])",
+}
+
+SCRIPT = """
+import sys, json
+import etl_to_sqlite as etl
+etl.DB_PATH, etl.USE_RSS = {db!r}, False
+{code}
+print("HEAVY=" + json.dumps([m for m in {heavy!r} if m in sys.modules]))
+"""
+
+def run_scenario(code: str, db: Path) -> tuple[float, list[str]]:
+    script = SCRIPT.format(db=str(db), code=code, heavy=HEAVY)
+    t0 = time.perf_counter()
+    out = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True, check=True).stdout
+    took = time.perf_counter() - t0
+    heavy = next((json.loads(line[6:]) for line in out.splitlines() if line.startswith("HEAVY=")), [])
+    return took, heavy
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--repeat", type=int, default=3, help="best-of-N per scenario")
+    args = ap.parse_args()
+    print(f"{'scenario':<16} {'best_s':>8}  heavy modules loaded")
+    for name, code in SCENARIOS.items():
+        best, heavy = None, []
+        for _ in range(args.repeat):
+            with tempfile.TemporaryDirectory() as tmp:
+                took, heavy = run_scenario(code, Path(tmp) / "startup.db")
+            best = took if best is None else min(best, took)
+        print(f"{name:<16} {best:>8.3f}  {', '.join(heavy) or '-'}")
+
+if __name__ == "__main__":
+    main()
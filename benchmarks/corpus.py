@@ -0,0 +1,62 @@
+# benchmarks/corpus.py
+# Seeded generator of realistic multi-asset news rows (same columns as the news CSV).
+
+import random
+from datetime import date, timedelta
+from typing import Iterator
+
+SIZES = {"10k": 10_000, "100k": 100_000, "1M": 1_000_000}
+
+SOURCES = ["Reuters", "CoinDesk", "Kitco", "Investing.com", "OilPrice", "FXStreet", "MarketWatch"]
+
+SUBJECTS = {
+    "BTC":    ["Bitcoin", "BTC", "Crypto markets", "Bitcoin ETF flows"],
+    "ETH":    ["Ethereum", "ETH", "Ether staking", "Ethereum developers"],
+    "GOLD":   ["Gold", "Spot gold", "Bullion", "XAU/USD"],
+    "OIL":    ["Oil", "Brent crude", "WTI", "Crude futures"],
+    "SP500":  ["The S&P 500", "US stocks", "S&P 500 futures", "Wall Street"],
+    "USD":    ["The US dollar", "The dollar index", "DXY", "The greenback"],
+    "EURUSD": ["EUR/USD", "The euro-dollar pair", "EURUSD", "The euro vs dollar"],
+}
+UP = ["rallies", "jumps", "rises", "climbs to a record", "extends gains", "strengthens"]
+DOWN = ["slips", "falls", "drops", "tumbles", "comes under pressure", "extends losses"]
+FLAT = ["holds steady", "trades sideways", "is little changed", "consolidates"]
+DRIVERS = [
+    "as Fed rate-cut bets build", "after hotter-than-expected CPI", "on supply concerns",
+    "amid recession worry", "as risk appetite improves", "ahead of the ECB decision",
+    "on strong earnings", "as safe-haven demand fades", "after OPEC+ output talks",
+    "as ETF inflows surge", "amid a broad sell-off", "on weak jobs data",
+]
+SUMMARY = [
+    "Analysts say momentum looks {tone} into the weekly close.",
+    "Traders remain {tone} while volumes stay thin.",
+    "Strategists call the move {tone} and watch support levels.",
+    "Positioning data points to a {tone} bias among funds.",
+    "Desk notes describe sentiment as {tone} but not euphoric.",
+]
+TONE = {"up": ["bullish", "positive", "optimistic"], "down": ["bearish", "weak", "fearful"],
+        "flat": ["neutral", "cautious", "mixed"]}
+
+def generate(n: int, seed: int = 42, start: date = date(2024, 1, 1), per_day: int = 400) -> Iterator[dict]:
+    """Yield n news rows; ~per_day rows share each date, ~15% mention a second asset."""
+    rnd = random.Random(seed)
+    assets = list(SUBJECTS)
+    for i in range(n):
+        asset = rnd.choice(assets)
+        mood = rnd.choices(["up", "down", "flat"], weights=[4, 4, 2])[0]
+        verb = rnd.choice({"up": UP, "down": DOWN, "flat": FLAT}[mood])
+        title = f"{rnd.choice(SUBJECTS[asset])} {verb} {rnd.choice(DRIVERS)}"
+        text = rnd.choice(SUMMARY).format(tone=rnd.choice(TONE[mood]))
+        if rnd.random() < 0.15:
+            other = rnd.choice([a for a in assets if a != asset])
+            text += f" {rnd.choice(SUBJECTS[other])} {rnd.choice(UP + DOWN)} in tandem."
+        yield {
+            "date": (start + timedelta(days=i // per_day)).isoformat(),
+            "source": rnd.choice(SOURCES),
+            "asset": asset,
+            "title": f"{title} ({i})" if rnd.random() < 0.9 else title,
+            "text": text,
+        }
+
+def texts(n: int, seed: int = 42) -> list[str]:
+    return [f"{r['title']} {r['text']}" for r in generate(n, seed)]
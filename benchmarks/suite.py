@@ -0,0 +1,109 @@
+# benchmarks/suite.py
+# Timed scenarios for the hourly job on a synthetic corpus, written to JSON so runs can be compared.
+#
+#   python -m benchmarks.suite --size 100k --out bench_new.json
+#   python -m benchmarks.suite --size 100k --compare bench_base.json --threshold 0.2
+#
+# With --compare the run exits 1 when any scenario is slower than the baseline
+# by more than --threshold (relative) and more than --min-delta seconds.
+
+import argparse
+import json
+import platform
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+import etl_to_sqlite as etl
+import export_json
+import storage
+from app import sentiment_lexicon
+from benchmarks import corpus
+
+def timed(fn, rows: int, repeat: int = 1) -> dict:
+    best = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        took = time.perf_counter() - t0
+        best = took if best is None else min(best, took)
+    return {"seconds": round(best, 4), "rows": rows, "rows_per_s": round(rows / best, 1) if best else None}
+
+def run(size: int, seed: int = 42, repeat: int = 1) -> dict:
+    rows = list(corpus.generate(size, seed))
+    texts = [f"{r['title']} {r['text']}" for r in rows]
+    results = {}
+
+    results["infer_asset"] = timed(lambda: [etl.infer_asset(r["title"], r["text"]) for r in rows], size, repeat)
+    results["lexicon_score_texts"] = timed(lambda: sentiment_lexicon.score_texts(texts), size, repeat)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Path(tmp) / "bench.db"
+        conn = storage.connect(db)
+        etl.ensure_tables(conn)
+        real_finbert = etl.finbert_scores
+        etl.finbert_scores = sentiment_lexicon.score_texts  # stub scorer: no model load / inference
+        try:
+            results["upsert_news"] = timed(lambda: etl.ingest(conn, iter(rows)), size)
+            results["upsert_news_all_dupes"] = timed(lambda: etl.ingest(conn, iter(rows)), size)
+        finally:
+            etl.finbert_scores = real_finbert
+        n_raw = conn.execute("SELECT COUNT(*) FROM news_raw").fetchone()[0]
+        results["recompute_daily_full"] = timed(lambda: etl.recompute_daily(conn, full_rebuild=True), n_raw, repeat)
+        results["recompute_daily_noop"] = timed(lambda: etl.recompute_daily(conn), n_raw, repeat)
+        conn.close()
+
+        n_daily = sqlite3.connect(db).execute("SELECT COUNT(*) FROM sentiments_daily").fetchone()[0]
+        export_json.DB, export_json.OUT = db, Path(tmp) / "daily_sentiment.json"
+        results["export_json"] = timed(lambda: export_json.main([]), n_daily, repeat)
+    return results
+
+def compare(results: dict, baseline: dict, threshold: float, min_delta: float = 0.01) -> list[str]:
+    regressions = []
+    for name, cur in results.items():
+        base = baseline.get("results", {}).get(name)
+        if not base or not base.get("seconds"):
+            continue
+        change = cur["seconds"] / base["seconds"] - 1
+        slower = cur["seconds"] - base["seconds"]
+        flag = "REGRESSION" if change > threshold and slower > min_delta else ""
+        print(f"{name:<24} {base['seconds']:>9.3f}s -> {cur['seconds']:>9.3f}s  {change:+7.1%} {flag}")
+        if flag:
+            regressions.append(name)
+    return regressions
+
+def main():
+    ap = argparse.ArgumentParser(description="ETL benchmark suite")
+    ap.add_argument("--size", choices=list(corpus.SIZES), default="10k")
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--repeat", type=int, default=1, help="best-of-N for the read-only scenarios")
+    ap.add_argument("--out", type=Path, default=Path("bench_results.json"))
+    ap.add_argument("--compare", type=Path, metavar="BASELINE_JSON")
+    ap.add_argument("--threshold", type=float, default=0.2)
+    ap.add_argument("--min-delta", type=float, default=0.01,
+                    help="ignore slowdowns smaller than this many seconds (timer noise)")
+    args = ap.parse_args()
+
+    results = run(corpus.SIZES[args.size], args.seed, args.repeat)
+    payload = {
+        "meta": {"size": args.size, "seed": args.seed, "python": platform.python_version(),
+                 "machine": platform.machine(), "at": datetime.utcnow().isoformat(timespec="seconds")},
+        "results": results,
+    }
+    args.out.write_text(json.dumps(payload, indent=2), encoding="utf-8")
+    for name, r in results.items():
+        print(f"{name:<24} {r['seconds']:>9.3f}s  {r['rows']:>9} rows  {r['rows_per_s'] or 0:>12,.0f} rows/s")
+    print("Wrote:", args.out)
+
+    if args.compare:
+        baseline = json.loads(args.compare.read_text(encoding="utf-8"))
+        if baseline.get("meta", {}).get("size") != args.size:
+            print(f"WARN: baseline size {baseline.get('meta', {}).get('size')} != {args.size}")
+        if compare(results, baseline, args.threshold, args.min_delta):
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -1,22 +1,176 @@
-import pandas as pd
-import sqlite3
+# Heavy modules (transformers/torch, feedparser, requests, pandas) are imported
+# where they're used, so aggregation-only and lexicon-only runs start fast.
+import csv
+import hashlib
+import re
+import time
+import uuid
+import argparse
+import atexit
+import json
+import os
+import random
+import signal
+import sys
+import threading
 from pathlib import Path
-from datetime import datetime
-import feedparser
+from datetime import date, datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+from itertools import chain, islice
+from multiprocessing import get_context
+from typing import Iterable, Iterator
 import yaml
 
-from app.sentiment_lexicon import score_texts as lexicon_scores
-from transformers import pipeline
+import storage
+from storage import content_hash, write_txn
+from app import near_dup
+from app.sentiment_lexicon import DEFAULT_SCORER as LEXICON, LEXICON_VERSION, score_texts as lexicon_scores
 
 CFG_PATH = Path("app/config.yaml")
 CFG = yaml.safe_load(open(CFG_PATH, "r", encoding="utf-8")) if CFG_PATH.exists() else {}
 MIN_ABS_FOR_DAILY = float(CFG.get("min_abs_final_for_daily", 0.12))
+EWMA_SPAN_DAYS = float(CFG.get("ewma_span_days", 7))  # alpha = 2 / (span + 1), decayed per calendar day
 USE_RSS = True
+RSS_TIMEOUT = float(CFG.get("rss_timeout_seconds", 15))
+RSS_WORKERS = int(CFG.get("rss_workers", 8))
+
+INGEST_BATCH_SIZE = int(CFG.get("ingest_batch_size", 1000))
+NEAR_DUP_MAX_HAMMING = int(CFG.get("near_dup_max_hamming", 5))  # SimHash bits; -1 = off
+NEAR_DUP_MIN_JACCARD = float(CFG.get("near_dup_min_jaccard", 0.7))  # token-set overlap to confirm a candidate
+NEAR_DUP_WINDOW_DAYS = int(CFG.get("near_dup_window_days", 2))
+
+DAEMON_INTERVAL = float(CFG.get("daemon_interval_seconds", 300))
+DAEMON_JITTER = float(CFG.get("daemon_jitter_seconds", 30))
+DAEMON_PORT = int(CFG.get("daemon_port", 8080))  # 0 = no health/metrics endpoint
 
 CSV_PATH = Path("data/news_sample_multiasset.csv")
+CSV_COLUMNS = {"date","source","asset","title","text"}
 DB_PATH = Path("data/sentiment.db")
 
+SCORERS = ("lexicon", "finbert", "blend")
+SCORER = CFG.get("scorer", "blend")  # blend = 0.7 * finbert + 0.3 * lexicon
+
 FINBERT_MODEL = CFG.get("finbert_model", "ProsusAI/finbert")
+FINBERT_REVISION = str(CFG.get("finbert_revision", "main"))
+FINBERT_BACKEND = CFG.get("finbert_backend", "torch")  # torch | onnx | onnx-int8
+FINBERT_BACKENDS = ("torch", "onnx", "onnx-int8")
+ONNX_DIR = Path(CFG.get("onnx_dir", "models/onnx"))
+FINBERT_BATCH_SIZE = int(CFG.get("finbert_batch_size", 32))
+FINBERT_MAX_LENGTH = int(CFG.get("finbert_max_length", 256))
+TORCH_THREADS = int(CFG.get("torch_threads", 0))  # 0 = leave torch default
+SCORE_CACHE_MAX_ROWS = int(CFG.get("score_cache_max_rows", 200_000))
+FINBERT_WORKERS = int(CFG.get("finbert_workers", 0))  # 0/1 = score in-process
+FINBERT_PARALLEL_MIN = int(CFG.get("finbert_parallel_min_texts", 256))  # smaller inputs stay in-process
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+def peak_rss_mb() -> float | None:
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+class RunMetrics:
+    """Per-stage wall time, row counts and peak RSS for one ETL run.
+
+    Stages are aggregated by name across micro-batches. Nested stages are
+    timed exclusively: a parent's seconds exclude its children's.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.run_id = uuid.uuid4().hex[:12]
+        self.started_at = datetime.utcnow().isoformat(timespec="seconds")
+        self.t0 = time.perf_counter()
+        self.stages: dict[str, dict] = {}
+        self._stack: list[float] = []
+
+    @contextmanager
+    def stage(self, name: str, rows_in: int | None = None):
+        rec = {"rows_in": rows_in, "rows_out": None}
+        self._stack.append(0.0)
+        t0 = time.perf_counter()
+        try:
+            yield rec
+        finally:
+            elapsed = time.perf_counter() - t0
+            child = self._stack.pop()
+            if self._stack:
+                self._stack[-1] += elapsed
+            self._charge(name, elapsed - child, rec["rows_in"] or 0, rec["rows_out"] or 0)
+
+    def _charge(self, name: str, seconds: float, rows_in: int, rows_out: int):
+        agg = self.stages.setdefault(name, {"calls": 0, "seconds": 0.0, "rows_in": 0, "rows_out": 0})
+        agg["calls"] += 1
+        agg["seconds"] += seconds
+        agg["rows_in"] += rows_in
+        agg["rows_out"] += rows_out
+        agg["peak_rss_mb"] = peak_rss_mb()
+
+    def timed_iter(self, name: str, rows: Iterable, chunk: int = 1000) -> Iterator:
+        """Yield from rows, charging the time spent producing them to stage `name`.
+
+        Only a perf_counter pair per row; the stage aggregate (and getrusage) is
+        updated once per `chunk` rows. An enclosing stage still excludes this time.
+        """
+        it = iter(rows)
+        seconds, n = 0.0, 0
+        try:
+            while True:
+                t0 = time.perf_counter()
+                try:
+                    row = next(it)
+                except StopIteration:
+                    return
+                finally:
+                    elapsed = time.perf_counter() - t0
+                    seconds += elapsed
+                    if self._stack:
+                        self._stack[-1] += elapsed
+                n += 1
+                if n == chunk:
+                    self._charge(name, seconds, 0, n)
+                    seconds, n = 0.0, 0
+                yield row
+        finally:
+            if n or seconds:
+                self._charge(name, seconds, 0, n)
+
+    def rows(self) -> list[tuple]:
+        total = {"calls": 1, "seconds": time.perf_counter() - self.t0, "rows_in": None,
+                 "rows_out": None, "peak_rss_mb": peak_rss_mb()}
+        out = []
+        for name, st in [*self.stages.items(), ("total", total)]:
+            n = st["rows_in"] or st["rows_out"]
+            rate = round(n / st["seconds"], 1) if n and st["seconds"] > 0 else None
+            out.append((self.run_id, self.started_at, name, st["calls"], round(st["seconds"], 4),
+                        st["rows_in"], st["rows_out"], rate, st["peak_rss_mb"]))
+        return out
+
+    def save(self, conn):
+        with write_txn(conn):
+            conn.executemany("""
+            INSERT OR REPLACE INTO etl_runs
+                (run_id, started_at, stage, calls, seconds, rows_in, rows_out, rows_per_s, peak_rss_mb)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, self.rows())
+
+    def summary(self) -> str:
+        lines = [f"{'stage':<18} {'calls':>6} {'seconds':>9} {'rows_in':>8} {'rows_out':>8} {'rows/s':>10} {'rss_mb':>7}"]
+        blank = lambda v: "" if v is None else v
+        for _, _, name, calls, sec, rin, rout, rate, rss in self.rows():
+            lines.append(f"{name:<18} {calls:>6} {sec:>9.3f} {blank(rin):>8} {blank(rout):>8} "
+                         f"{blank(rate):>10} {blank(rss):>7}")
+        return "\n".join(lines)
+
+METRICS = RunMetrics()
 
 RSS_SOURCES = [
     "https://feeds.reuters.com/reuters/businessNews",
@@ -28,8 +182,8 @@ RSS_SOURCES = [
     "https://www.fxstreet.com/rss"
 ]
 
-ASSET_KEYWORDS = {
-    "BTC":    ["bitcoin", "btc", "crypto"],
+DEFAULT_ASSET_KEYWORDS = {
+    "BTC":    ["bitcoin", "btc", "crypto", "cryptocurrency", "cryptocurrencies"],
     "ETH":    ["ethereum", "eth"],
     "GOLD":   ["gold", "xau", "bullion", "precious metal", "safe haven"],
     "OIL":    ["oil", "brent", "wti", "crude"],
@@ -37,134 +191,977 @@ ASSET_KEYWORDS = {
     "USD":    ["us dollar", "dollar index", "dxy", "greenback", "usd"],
     "EURUSD": ["eurusd", "eur/usd", "euro-dollar", "euro vs dollar"]
 }
+ASSET_KEYWORDS = CFG.get("asset_keywords") or DEFAULT_ASSET_KEYWORDS
+ASSET_MATCH = CFG.get("asset_match", "all")  # "all": one row per matched asset, "best": top asset only
+
+def trie_regex(words) -> str:
+    """Regex alternation built from a character trie, so shared prefixes are tested once."""
+    trie = {}
+    for w in words:
+        node = trie
+        for ch in w:
+            node = node.setdefault(ch, {})
+        node[""] = True
+    def build(node):
+        branches = [re.escape(ch) + build(sub) for ch, sub in sorted(node.items()) if ch]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        return f"(?:{body})?" if "" in node else body
+    return build(trie)
+
+class AssetMatcher:
+    """Single-pass keyword matcher: one combined word-boundary regex for all assets.
+
+    Longer keywords win over their prefixes ("ethereum" before "eth") and a
+    trailing plural "s" is allowed, so "oil" no longer matches inside "turmoil".
+    """
+
+    def __init__(self, keywords: dict[str, list[str]]):
+        self.assets = list(keywords)
+        self._asset_of = {}
+        for asset, kws in keywords.items():
+            for kw in kws:
+                self._asset_of.setdefault(str(kw).lower(), asset)
+        self._rx = re.compile(r"(?<![a-z0-9])(" + trie_regex(self._asset_of) + r")s?(?![a-z0-9])")
+
+    def match(self, text: str) -> dict[str, int]:
+        """Return {asset: keyword hit count} for every asset mentioned in text."""
+        counts = {}
+        for kw in self._rx.findall(text.lower()):
+            asset = self._asset_of[kw]
+            counts[asset] = counts.get(asset, 0) + 1
+        return counts
+
+    def best(self, text: str) -> str | None:
+        counts = self.match(text)
+        if not counts:
+            return None
+        return max(self.assets, key=lambda a: (counts.get(a, 0), -self.assets.index(a)))
+
+ASSET_MATCHER = AssetMatcher(ASSET_KEYWORDS)
 
 def ensure_tables(conn):
-    conn.execute("""
-    CREATE TABLE IF NOT EXISTS news_raw (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        date TEXT,
-        source TEXT,
-        asset TEXT,
-        title TEXT,
-        text TEXT,
-        sentiment REAL,
-        confidence REAL
-    )
-    """)
-    conn.execute("""
-    CREATE TABLE IF NOT EXISTS sentiments_daily (
-        day TEXT,
-        asset TEXT,
-        avg_sentiment REAL,
-        count_used INTEGER,
-        PRIMARY KEY (day, asset)
-    )
-    """)
-    conn.commit()
+    storage.migrate(conn)
+    if get_state(conn, "near_dup_backfilled") is None:
+        backfill_near_dup(conn)
+
+def get_state(conn, key: str, default=None):
+    row = conn.execute("SELECT value FROM etl_state WHERE key = ?", (key,)).fetchone()
+    return row[0] if row else default
+
+def set_state(conn, key: str, value):
+    conn.execute("INSERT OR REPLACE INTO etl_state (key, value) VALUES (?, ?)", (key, str(value)))
+
+def existing_hashes(conn, hashes: list[str], chunk: int = 500) -> set[str]:
+    found = set()
+    for i in range(0, len(hashes), chunk):
+        part = hashes[i:i+chunk]
+        q = f"SELECT content_hash FROM news_raw WHERE content_hash IN ({','.join('?' * len(part))})"
+        found.update(r[0] for r in conn.execute(q, part))
+    return found
+
+def infer_assets(title: str, summary: str) -> dict[str, int]:
+    return ASSET_MATCHER.match(f"{title} {summary}")
 
 def infer_asset(title: str, summary: str) -> str | None:
-    text = f"{title} {summary}".lower()
-    for asset, kws in ASSET_KEYWORDS.items():
-        if any(kw in text for kw in kws):
-            return asset
-    return None
+    return ASSET_MATCHER.best(f"{title} {summary}")
+
+def fetch_feed(url: str, cached: dict | None = None):
+    """Conditional GET of one feed. Returns (feed or None if unchanged, validators)."""
+    import feedparser
+    from app import http_client
+
+    cached = cached or {}
+    headers = {"User-Agent": "ai-market-sentiment/1.0 (+feedparser)"}
+    if cached.get("etag"):
+        headers["If-None-Match"] = cached["etag"]
+    if cached.get("modified"):
+        headers["If-Modified-Since"] = cached["modified"]
+    # No retries; a dead feed is retried next run. requests' timeout only bounds each
+    # socket wait, so the body is read in small reads against RSS_TIMEOUT of wall clock
+    # (a server trickling bytes would otherwise hold a worker indefinitely).
+    deadline = time.monotonic() + RSS_TIMEOUT
+    r = http_client.get(url, headers=headers, timeout=RSS_TIMEOUT, retries=0, stream=True)
+    with r:
+        if r.status_code == 304:
+            return None, cached
+        r.raise_for_status()
+        read = getattr(r.raw, "read1", None)  # urllib3 >= 2: returns what one recv() delivered
+        chunks = iter(lambda: read(1 << 16, decode_content=True), b"") if read else r.iter_content(1 << 16)
+        body = bytearray()
+        for chunk in chunks:
+            body += chunk
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"feed not read within {RSS_TIMEOUT:g}s: {url}")
+    validators = {"etag": r.headers.get("ETag"), "modified": r.headers.get("Last-Modified")}
+    return feedparser.parse(bytes(body)), validators
 
-def fetch_rss_rows() -> list[dict]:
+def load_rss_cache(conn) -> dict[str, dict]:
+    rows = conn.execute("SELECT url, etag, modified FROM rss_cache").fetchall()
+    return {u: {"etag": e, "modified": m} for u, e, m in rows}
+
+def save_rss_cache(conn, cache: dict[str, dict]):
+    now = datetime.utcnow().isoformat(timespec="seconds")
+    with write_txn(conn):
+        conn.executemany(
+            "INSERT OR REPLACE INTO rss_cache (url, etag, modified, fetched_at) VALUES (?, ?, ?, ?)",
+            [(url, v.get("etag"), v.get("modified"), now) for url, v in cache.items()])
+
+def feed_rows(feed, today: str) -> list[dict]:
     rows = []
+    source = feed.feed.title if hasattr(feed, "feed") and hasattr(feed.feed, "title") else "RSS"
+    for e in feed.entries:
+        title = getattr(e, "title", "") or ""
+        summary = getattr(e, "summary", "") or ""
+        if ASSET_MATCH == "best":
+            assets = [a for a in [infer_asset(title, summary)] if a]
+        else:
+            assets = list(infer_assets(title, summary))
+        for asset in assets:
+            rows.append({
+                "date": today,
+                "source": source,
+                "asset": asset,
+                "title": title.strip(),
+                "text": summary.strip()
+            })
+    return rows
+
+def iter_rss_rows(cache: dict[str, dict] | None = None, sources: list[str] | None = None) -> Iterator[dict]:
+    """Fetch all feeds concurrently and yield rows feed by feed as they arrive.
+
+    `cache` maps url -> ETag/Last-Modified validators (see load_rss_cache);
+    feeds answering 304 are skipped and fresh validators are written back into
+    the dict. Persist it with save_rss_cache only after the rows are stored.
+    """
+    sources = RSS_SOURCES if sources is None else sources
+    if not sources:
+        return
+    cache = {} if cache is None else cache
     today = datetime.utcnow().strftime("%Y-%m-%d")
-    for url in RSS_SOURCES:
-        try:
-            feed = feedparser.parse(url)
-            for e in feed.entries:
-                title = getattr(e, "title", "") or ""
-                summary = getattr(e, "summary", "") or ""
-                asset = infer_asset(title, summary)
-                if not asset:
-                    continue
-                source = feed.feed.title if hasattr(feed, "feed") and hasattr(feed.feed, "title") else "RSS"
-                rows.append({
-                    "date": today,
-                    "source": source,
-                    "asset": asset,
-                    "title": title.strip(),
-                    "text": summary.strip()
-                })
-        except Exception:
-            continue
+    with ThreadPoolExecutor(max_workers=max(1, min(RSS_WORKERS, len(sources)))) as ex:
+        futures = {ex.submit(fetch_feed, url, cache.get(url)): url for url in sources}
+        for fut in as_completed(futures):
+            try:
+                feed, validators = fut.result()
+            except Exception:
+                continue
+            cache[futures[fut]] = validators
+            if feed is not None:
+                yield from feed_rows(feed, today)
+
+def fetch_rss_rows(conn=None, sources: list[str] | None = None) -> list[dict]:
+    cache = load_rss_cache(conn) if conn is not None else {}
+    rows = list(iter_rss_rows(cache, sources))
+    if conn is not None:
+        save_rss_cache(conn, cache)
     return rows
 
+def _signed_score(r: dict) -> float:
+    label = r.get("label","neutral").lower()
+    score = float(r.get("score",0.5))
+    if label.startswith("pos"): return +score
+    if label.startswith("neg"): return -score
+    return 0.0
+
+def onnx_model_dir(model: str = FINBERT_MODEL, backend: str = "onnx") -> Path:
+    """Where `finbert_onnx.py export` writes the ONNX (and int8) copy of a model."""
+    base = ONNX_DIR / re.sub(r"[^A-Za-z0-9_.-]+", "--", str(model))
+    return base / "int8" if backend == "onnx-int8" else base
+
+ONNX_FILE = {"onnx": "model.onnx", "onnx-int8": "model_quantized.onnx"}
+
+class FinbertScorer:
+    """Holds one FinBERT pipeline per process and scores texts in batches.
+
+    backend is "torch" (plain transformers), or "onnx" / "onnx-int8" for the
+    ONNX Runtime copies produced by `python finbert_onnx.py export`.
+    """
+
+    def __init__(self, model: str = FINBERT_MODEL, batch_size: int = FINBERT_BATCH_SIZE,
+                 max_length: int = FINBERT_MAX_LENGTH, threads: int = TORCH_THREADS,
+                 revision: str = FINBERT_REVISION, backend: str = FINBERT_BACKEND):
+        if backend not in FINBERT_BACKENDS:
+            raise ValueError(f"finbert_backend must be one of {FINBERT_BACKENDS}, got {backend!r}")
+        self.model = model
+        self.revision = revision
+        self.backend = backend
+        self.batch_size = max(1, batch_size)
+        self.max_length = max_length
+        self.threads = threads
+        self._nlp = None
+
+    def load(self):
+        if self._nlp is None:
+            with METRICS.stage("model_load"):
+                if self.backend == "torch":
+                    self._nlp = self._load_torch()
+                else:
+                    self._nlp = self._load_onnx()
+        return self._nlp
+
+    def _load_torch(self):
+        from transformers import pipeline
+        if self.threads > 0:
+            import torch
+            torch.set_num_threads(self.threads)
+        return pipeline("sentiment-analysis", model=self.model, tokenizer=self.model,
+                        revision=self.revision)
+
+    def _load_onnx(self):
+        import onnxruntime
+        from optimum.onnxruntime import ORTModelForSequenceClassification
+        from transformers import AutoTokenizer, pipeline
+        path = onnx_model_dir(self.model, self.backend)
+        if not (path / ONNX_FILE[self.backend]).exists():
+            raise FileNotFoundError(f"{path / ONNX_FILE[self.backend]} missing; "
+                                    f"run: python finbert_onnx.py export --model {self.model}")
+        opts = onnxruntime.SessionOptions()
+        if self.threads > 0:
+            opts.intra_op_num_threads = self.threads
+        model = ORTModelForSequenceClassification.from_pretrained(
+            path, file_name=ONNX_FILE[self.backend], session_options=opts)
+        return pipeline("sentiment-analysis", model=model, tokenizer=AutoTokenizer.from_pretrained(path))
+
+    def score(self, texts: list[str]) -> list[float]:
+        if not texts:
+            return []
+        nlp = self.load()
+        out = nlp(list(texts), batch_size=self.batch_size, truncation=True, max_length=self.max_length)
+        return [_signed_score(r) for r in out]
+
+_FINBERT: FinbertScorer | None = None
+
+def get_finbert() -> FinbertScorer:
+    global _FINBERT
+    if _FINBERT is None:
+        _FINBERT = FinbertScorer()
+    return _FINBERT
+
+# ---------- process-pool scoring ----------
+_WORKER_SCORER: FinbertScorer | None = None
+
+def _init_worker(scorer_kwargs: dict):
+    global _WORKER_SCORER
+    threads = str(scorer_kwargs["threads"])
+    # set before torch / onnxruntime are imported in this process
+    os.environ.update(OMP_NUM_THREADS=threads, MKL_NUM_THREADS=threads, TOKENIZERS_PARALLELISM="false")
+    _WORKER_SCORER = FinbertScorer(**scorer_kwargs)
+    _WORKER_SCORER.load()
+
+def _score_shard(texts: list[str]) -> list[float]:
+    return _WORKER_SCORER.score(texts)
+
+class FinbertPool:
+    """Shards texts across worker processes, each holding one FinbertScorer loaded once.
+
+    Intra-op threads per worker default to cpu_count // workers so the pool
+    doesn't oversubscribe cores. score() returns scores in input order.
+    """
+
+    def __init__(self, workers: int | None = None, threads: int | None = None, **scorer_kwargs):
+        # read at call time: main() rebinds FINBERT_WORKERS from --workers
+        self.workers = max(1, FINBERT_WORKERS if workers is None else workers)
+        threads = TORCH_THREADS if threads is None else threads
+        threads = threads if threads > 0 else max(1, (os.cpu_count() or 1) // self.workers)
+        self.scorer_kwargs = {**scorer_kwargs, "threads": threads}
+        self.batch_size = self.scorer_kwargs.get("batch_size", FINBERT_BATCH_SIZE)
+        self._pool: ProcessPoolExecutor | None = None
+
+    def start(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            with METRICS.stage("model_load"):
+                # spawn: forked torch / tokenizer state isn't safe, and the module imports cheaply
+                self._pool = ProcessPoolExecutor(self.workers, mp_context=get_context("spawn"),
+                                                 initializer=_init_worker, initargs=(self.scorer_kwargs,))
+                # one no-op task per worker spawns them all now, so the model loads overlap
+                list(self._pool.map(_score_shard, [[]] * self.workers))
+        return self._pool
+
+    def score(self, texts: list[str]) -> list[float]:
+        if not texts:
+            return []
+        pool = self.start()
+        # a few shards per worker evens out the tail; whole batches keep padding waste low
+        size = max(self.batch_size, -(-len(texts) // (self.workers * 4)))
+        shards = [texts[i:i+size] for i in range(0, len(texts), size)]
+        return list(chain.from_iterable(pool.map(_score_shard, shards)))
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
+
+_FINBERT_POOL: FinbertPool | None = None
+
+def get_finbert_pool() -> FinbertPool:
+    global _FINBERT_POOL
+    if _FINBERT_POOL is None:
+        _FINBERT_POOL = FinbertPool(workers=FINBERT_WORKERS, threads=TORCH_THREADS)
+        atexit.register(_FINBERT_POOL.close)
+    return _FINBERT_POOL
+
 def finbert_scores(texts):
-    nlp = pipeline("sentiment-analysis", model=FINBERT_MODEL, tokenizer=FINBERT_MODEL)
-    out = nlp(texts, truncation=True)
-    vals = []
-    for r in out:
-        label = r.get("label","neutral").lower()
-        score = float(r.get("score",0.5))
-        if label.startswith("pos"): vals.append(+score)
-        elif label.startswith("neg"): vals.append(-score)
-        else: vals.append(0.0)
-    return vals
-
-def upsert_news(conn, rows: list[dict]):
+    if FINBERT_WORKERS > 1 and len(texts) >= FINBERT_PARALLEL_MIN:
+        return get_finbert_pool().score(texts)
+    return get_finbert().score(texts)
+
+NEWS_COLUMNS = ["date","source","asset","title","text","sentiment","confidence","content_hash","dup_of"]
+
+def score_model_key(scorer: str | None = None) -> str:
+    """Identifies everything a cached score depends on; changing any part invalidates the cache."""
+    finbert = f"{FINBERT_MODEL}@{FINBERT_REVISION}:{FINBERT_BACKEND}"
+    lexicon = f"lexicon-v{LEXICON_VERSION}"
+    return {"lexicon": lexicon, "finbert": finbert, "blend": f"{finbert}|{lexicon}"}[scorer or SCORER]
+
+def text_hash(text: str) -> str:
+    norm = " ".join(str(text).lower().split())
+    return hashlib.sha256(norm.encode("utf-8")).hexdigest()
+
+def cached_scores(conn, texts: list[str]) -> tuple[list[float | None], list[float | None]]:
+    """(finbert, lexicon) scores for texts, running the models only on cache misses.
+
+    A scorer that SCORER doesn't use comes back as None and is never loaded.
+    """
+    key = score_model_key()
+    with METRICS.stage("score_cache", rows_in=len(texts)) as st:
+        hashes = [text_hash(t) for t in texts]
+        uniq = list(dict.fromkeys(hashes))
+        found = {}
+        for i in range(0, len(uniq), 500):
+            part = uniq[i:i+500]
+            q = (f"SELECT text_hash, finbert, lexicon FROM score_cache "
+                 f"WHERE model_key = ? AND text_hash IN ({','.join('?' * len(part))})")
+            found.update((h, (f, l)) for h, f, l in conn.execute(q, [key, *part]))
+        first = {}
+        for h, t in zip(hashes, texts):
+            first.setdefault(h, t)
+        misses = [h for h in uniq if h not in found]
+        st["rows_out"] = len(misses)
+    if misses:
+        miss_texts = [first[h] for h in misses]
+        f_scores = l_scores = [None] * len(miss_texts)
+        if SCORER != "lexicon":
+            with METRICS.stage("inference_finbert", rows_in=len(miss_texts)):
+                f_scores = finbert_scores(miss_texts)
+        if SCORER != "finbert":
+            with METRICS.stage("inference_lexicon", rows_in=len(miss_texts)):
+                l_scores = lexicon_scores(miss_texts)
+        found.update(zip(misses, zip(f_scores, l_scores)))
+    with METRICS.stage("score_cache"):
+        now = int(time.time())
+        conn.executemany(
+            "INSERT OR REPLACE INTO score_cache (text_hash, model_key, finbert, lexicon, last_used) VALUES (?, ?, ?, ?, ?)",
+            [(h, key, *found[h], now) for h in uniq])
+        evict_score_cache(conn, added=len(misses))
+    return [found[h][0] for h in hashes], [found[h][1] for h in hashes]
+
+SCORE_CACHE_RECOUNT_BATCHES = 50  # exact COUNT(*) this often; a running count in between
+_score_cache_rows: dict[str | int, list[int]] = {}  # db file -> [approx rows, batches since recount]
+
+def _db_key(conn) -> str | int:
+    """The connection's main database file; id(conn) for in-memory databases.
+
+    id() alone is reused once a connection is garbage collected, so a new
+    connection could inherit a stale running count.
+    """
+    return conn.execute("PRAGMA database_list").fetchone()[2] or id(conn)
+
+def evict_score_cache(conn, max_rows: int = SCORE_CACHE_MAX_ROWS, added: int = 0):
+    """Trim score_cache to max_rows (least recently used first) after a batch added `added` rows.
+
+    Stale model keys are purged once per database file, not on every batch.
+    """
+    key = _db_key(conn)
+    state = _score_cache_rows.get(key)
+    if state is None:
+        # keep the current key of every scorer so switching --scorer back and forth stays warm
+        keys = sorted({score_model_key(s) for s in SCORERS})
+        conn.execute(f"DELETE FROM score_cache WHERE model_key NOT IN ({','.join('?' * len(keys))})", keys)
+        state = _score_cache_rows[key] = [0, SCORE_CACHE_RECOUNT_BATCHES]
+    state[0] += added
+    state[1] += 1
+    if state[1] >= SCORE_CACHE_RECOUNT_BATCHES:
+        state[:] = [conn.execute("SELECT COUNT(*) FROM score_cache").fetchone()[0], 0]
+    extra = state[0] - max_rows
+    if extra > 0:
+        conn.execute("""
+        DELETE FROM score_cache WHERE rowid IN
+            (SELECT rowid FROM score_cache ORDER BY last_used LIMIT ?)
+        """, (extra,))
+        state[0] -= extra
+
+def upsert_news(conn, rows: list[dict]) -> tuple[int, int]:
+    """Score and insert unseen rows in one write transaction. Returns (inserted, skipped)."""
     if not rows:
-        return pd.DataFrame(columns=["date","source","asset","title","text","sentiment"])
-    df = pd.DataFrame(rows)
-    texts = (df["title"].fillna("") + " " + df["text"].fillna("")).tolist()
-    f_scores = finbert_scores(texts)
-    l_scores = lexicon_scores(texts)
-    final = [0.7*fs + 0.3*ls for fs, ls in zip(f_scores, l_scores)]
-    df["sentiment"] = final
-    df["confidence"] = [abs(s) for s in f_scores]
-    df["date"] = pd.to_datetime(df["date"], errors="coerce").dt.strftime("%Y-%m-%d")
-    df = df.dropna(subset=["date"])
-    df["key"] = df["date"].astype(str) + "|" + df["asset"].astype(str) + "|" + df["title"].astype(str)
-    existing = pd.read_sql_query("SELECT date, asset, title FROM news_raw", conn)
-    if not existing.empty:
-        existing["key"] = existing["date"].astype(str) + "|" + existing["asset"].astype(str) + "|" + existing["title"].astype(str)
-        df = df[~df["key"].isin(existing["key"])]
-    if not df.empty:
-        df[["date","source","asset","title","text","sentiment","confidence"]].to_sql("news_raw", conn, if_exists="append", index=False)
-    return df
-
-def recompute_daily(conn):
-    raw = pd.read_sql_query("SELECT date, asset, sentiment, confidence FROM news_raw", conn)
-    if raw.empty:
-        return pd.DataFrame(columns=["day","asset","avg_sentiment","count_used"])
-    raw["date"] = pd.to_datetime(raw["date"])
-    use = (raw["sentiment"].abs() >= MIN_ABS_FOR_DAILY)
-    raw_use = raw.loc[use].copy()
-    if raw_use.empty:
-        daily = pd.DataFrame(columns=["day","asset","avg_sentiment","count_used"])
+        return 0, 0
+    with write_txn(conn):
+        return _upsert_news(conn, rows)
+
+def final_scores(f_scores, l_scores) -> tuple[list[float], list[float]]:
+    """(sentiment, confidence) per text for the active SCORER."""
+    if SCORER == "lexicon":
+        return list(l_scores), [abs(s) for s in l_scores]
+    if SCORER == "finbert":
+        return list(f_scores), [abs(s) for s in f_scores]
+    return [0.7*fs + 0.3*ls for fs, ls in zip(f_scores, l_scores)], [abs(s) for s in f_scores]
+
+# ---------- near-duplicates ----------
+def backfill_near_dup(conn, chunk: int = 5000):
+    """Fingerprint canonical rows stored before the near_dup index existed (runs once)."""
+    with write_txn(conn):
+        cur = conn.execute("""
+        SELECT id, asset, date, title, text FROM news_raw
+        WHERE dup_of IS NULL AND id NOT IN (SELECT news_id FROM near_dup)
+        """)
+        while rows := cur.fetchmany(chunk):
+            fps = near_dup.simhashes([(t, x) for _, _, _, t, x in rows])
+            conn.executemany("INSERT OR IGNORE INTO near_dup (news_id, asset, day, simhash) VALUES (?, ?, ?, ?)",
+                             [(i, a, d, near_dup.to_signed(fp)) for (i, a, d, _, _), fp in zip(rows, fps)
+                              if fp is not None])
+        set_state(conn, "near_dup_backfilled", 1)
+
+class NearDupIndex:
+    """Canonical fingerprints for the assets/days of one batch: near_dup rows plus the batch's own.
+
+    A canonical row of the same asset published within NEAR_DUP_WINDOW_DAYS whose
+    SimHash is within NEAR_DUP_MAX_HAMMING bits is a candidate; the caller's
+    confirm() decides whether the row really duplicates it.
+    """
+
+    def __init__(self, conn, rows: list[dict], max_hamming: int = NEAR_DUP_MAX_HAMMING,
+                 window_days: int = NEAR_DUP_WINDOW_DAYS):
+        import numpy as np
+
+        self.max_hamming = max_hamming
+        self.window = window_days
+        # asset -> [day ordinals, fingerprints, canonical (news_raw id or batch row), size]
+        self.assets: dict[str, list] = {}
+        days = [date.fromisoformat(r["date"]) for r in rows]
+        if not days:
+            return
+        lo = (min(days) - timedelta(days=window_days)).isoformat()
+        hi = (max(days) + timedelta(days=window_days)).isoformat()
+        per_asset = {}
+        for r in rows:
+            per_asset[str(r.get("asset"))] = per_asset.get(str(r.get("asset")), 0) + 1
+        for asset, pending in per_asset.items():
+            found = conn.execute(
+                "SELECT day, simhash, news_id FROM near_dup WHERE asset = ? AND day BETWEEN ? AND ?",
+                (asset, lo, hi)).fetchall()
+            # room for every batch row to become canonical
+            size = len(found) + pending
+            ords, fps = np.zeros(size, dtype=np.int64), np.zeros(size, dtype=np.uint64)
+            ords[:len(found)] = [date.fromisoformat(d).toordinal() for d, _, _ in found]
+            fps[:len(found)] = [near_dup.to_unsigned(fp) for _, fp, _ in found]
+            self.assets[asset] = [ords, fps, [i for _, _, i in found], len(found)]
+
+    def match(self, row: dict, fp: int | None, confirm=None):
+        """The canonical news_raw id or batch row that row duplicates; None makes row canonical.
+
+        Candidates are tried nearest first; confirm(canonical) -> bool vets each one.
+        """
+        import numpy as np
+
+        if fp is None:
+            return None
+        entry = self.assets[str(row.get("asset"))]
+        ords, fps, canon, n = entry
+        day = date.fromisoformat(row["date"]).toordinal()
+        dist = near_dup.distances(fp, fps[:n])
+        near = np.flatnonzero((abs(ords[:n] - day) <= self.window) & (dist <= self.max_hamming))
+        for j in near[np.argsort(dist[near], kind="stable")]:
+            if confirm is None or confirm(canon[int(j)]):
+                return canon[int(j)]
+        ords[n], fps[n] = day, fp
+        canon.append(row)
+        entry[3] = n + 1
+        return None
+
+def mark_near_dups(conn, news: list[dict]) -> list[dict]:
+    """Set r["simhash"] and, for near-duplicates, r["dup_of"] / r["dup_of_row"]. Returns the canonical rows."""
+    if NEAR_DUP_MAX_HAMMING < 0:
+        return news
+    def signature(title, text):
+        return set(near_dup.normalize(title, text)), LEXICON.hits(f"{title or ''} {text or ''}")
+
+    stored = {}  # news_raw id -> signature, fetched only for SimHash candidates
+
+    def canon_signature(canon):
+        if not isinstance(canon, int):
+            return canon["_signature"]
+        if canon not in stored:
+            t = conn.execute("SELECT title, text FROM news_raw WHERE id = ?", (canon,)).fetchone()
+            stored[canon] = signature(*t) if t else (set(), None)
+        return stored[canon]
+
+    with METRICS.stage("near_dup", rows_in=len(news)) as st:
+        index = NearDupIndex(conn, news)
+        fps = near_dup.simhashes([(r.get("title"), r.get("text")) for r in news])
+        canonical = []
+        for r, fp in zip(news, fps):
+            r["simhash"] = fp
+            if fp is None:
+                canon = None
+            else:
+                r["_signature"] = sig = signature(r.get("title"), r.get("text"))
+                canon = index.match(r, fp, lambda c: near_dup.same_story(*sig, *canon_signature(c),
+                                                                         NEAR_DUP_MIN_JACCARD))
+            r["dup_of"], r["dup_of_row"] = (canon, None) if isinstance(canon, int) else (None, canon)
+            if canon is None:
+                canonical.append(r)
+        st["rows_out"] = len(news) - len(canonical)
+    return canonical
+
+def copy_dup_scores(conn, news: list[dict]):
+    """Near-duplicates take the sentiment/confidence of their canonical article."""
+    stored = [r["dup_of"] for r in news if r.get("dup_of") is not None]
+    scores = {}
+    for i in range(0, len(stored), 500):
+        part = stored[i:i+500]
+        scores.update((i, (s, c)) for i, s, c in conn.execute(
+            f"SELECT id, sentiment, confidence FROM news_raw WHERE id IN ({','.join('?' * len(part))})", part))
+    for r in news:
+        if r.get("dup_of") is not None:
+            r["sentiment"], r["confidence"] = scores.get(r["dup_of"], (None, None))
+        elif r.get("dup_of_row") is not None:
+            r["sentiment"], r["confidence"] = r["dup_of_row"]["sentiment"], r["dup_of_row"]["confidence"]
+
+def ids_for_hashes(conn, hashes: list[str], chunk: int = 500) -> dict[str, int]:
+    found = {}
+    for i in range(0, len(hashes), chunk):
+        part = hashes[i:i+chunk]
+        q = f"SELECT content_hash, id FROM news_raw WHERE content_hash IN ({','.join('?' * len(part))})"
+        found.update(conn.execute(q, part))
+    return found
+
+def normalize_day(value) -> str | None:
+    """'YYYY-MM-DD' for a date/datetime string, None if it doesn't parse."""
+    text = str(value or "").strip()
+    if not text:
+        return None
+    try:
+        return date.fromisoformat(text[:10]).isoformat()
+    except ValueError:
+        pass
+    import pandas as pd  # only for the odd non-ISO date
+    ts = pd.to_datetime(text, errors="coerce")
+    return None if pd.isna(ts) else ts.strftime("%Y-%m-%d")
+
+def _upsert_news(conn, rows: list[dict]) -> tuple[int, int]:
+    with METRICS.stage("dedup", rows_in=len(rows)) as st:
+        fresh = {}
+        for r in rows:
+            day = normalize_day(r.get("date"))
+            if day is None:
+                continue
+            h = content_hash(day, str(r.get("asset")), str(r.get("title")))
+            # dedup before scoring so only unseen articles reach the model
+            fresh.setdefault(h, {**r, "date": day, "content_hash": h})
+        for h in existing_hashes(conn, list(fresh)):
+            del fresh[h]
+        st["rows_out"] = len(fresh)
+    if not fresh:
+        return 0, len(rows)
+    news = list(fresh.values())
+    canonical = mark_near_dups(conn, news)
+    texts = [f"{r.get('title') or ''} {r.get('text') or ''}" for r in canonical]
+    f_scores, l_scores = cached_scores(conn, texts) if texts else ([], [])
+    for r, sentiment, confidence in zip(canonical, *final_scores(f_scores, l_scores)):
+        r["sentiment"], r["confidence"] = sentiment, confidence
+    copy_dup_scores(conn, news)
+    with METRICS.stage("db_write", rows_in=len(news)) as st:
+        insert = (f"INSERT OR IGNORE INTO news_raw ({', '.join(NEWS_COLUMNS)}) "
+                  f"VALUES ({', '.join('?' * len(NEWS_COLUMNS))})")
+        # canonical rows first: duplicates of this batch's rows need their ids
+        inserted = conn.executemany(insert, ([r.get(c) for c in NEWS_COLUMNS] for r in canonical)).rowcount
+        indexed = [r for r in canonical if r.get("simhash") is not None]
+        ids = ids_for_hashes(conn, [r["content_hash"] for r in indexed]) if indexed else {}
+        conn.executemany("INSERT OR IGNORE INTO near_dup (news_id, asset, day, simhash) VALUES (?, ?, ?, ?)",
+                         [(ids[r["content_hash"]], r.get("asset"), r["date"], near_dup.to_signed(r["simhash"]))
+                          for r in indexed if r["content_hash"] in ids])
+        dups = [r for r in news if r.get("dup_of") is not None or r.get("dup_of_row") is not None]
+        for r in dups:
+            if r["dup_of"] is None:
+                r["dup_of"] = ids.get(r["dup_of_row"]["content_hash"])
+        inserted += conn.executemany(insert, ([r.get(c) for c in NEWS_COLUMNS] for r in dups)).rowcount
+        st["rows_out"] = inserted
+    return inserted, len(rows) - inserted
+
+def recompute_daily(conn, full_rebuild: bool = False) -> list[tuple[str, str]]:
+    with write_txn(conn):
+        with METRICS.stage("aggregate") as st:
+            touched = _recompute_daily(conn, full_rebuild)
+            st["rows_out"] = len(touched)
+        with METRICS.stage("rolling", rows_in=len(touched)) as st:
+            st["rows_out"] = update_rolling(conn, touched)
+    return touched
+
+def _recompute_daily(conn, full_rebuild: bool = False) -> list[tuple[str, str]]:
+    """Fold news_raw rows added since the last run into sentiments_daily.
+
+    Keeps a running sum and count per (day, asset) and only touches the groups
+    that received new rows. A full rebuild happens on request, on first run,
+    or when min_abs_final_for_daily has changed. Returns the touched groups.
+    """
+    last_id = get_state(conn, "daily_last_id")
+    min_abs = get_state(conn, "daily_min_abs")
+    if full_rebuild or last_id is None or min_abs is None or float(min_abs) != MIN_ABS_FOR_DAILY:
+        conn.execute("DELETE FROM sentiments_daily")
+        set_state(conn, "daily_rebuilt_at", conn.execute(f"SELECT {storage.NOW_SQL}").fetchone()[0])
+        last_id = 0
+    last_id = int(last_id)
+    max_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM news_raw").fetchone()[0]
+    where = """
+        FROM news_raw
+        WHERE id > ? AND id <= ? AND ABS(sentiment) >= ?
+          AND date IS NOT NULL AND asset IS NOT NULL AND dup_of IS NULL
+    """
+    params = (last_id, max_id, MIN_ABS_FOR_DAILY)
+    touched = conn.execute(f"SELECT DISTINCT date, asset {where}", params).fetchall()
+    conn.execute(f"""
+    INSERT INTO sentiments_daily (day, asset, avg_sentiment, count_used, sum_sentiment,
+                                  sum_conf, sum_conf_sentiment, updated_at)
+    SELECT date, asset, AVG(sentiment), COUNT(*), SUM(sentiment),
+           TOTAL(confidence), TOTAL(sentiment * confidence), {storage.NOW_SQL} {where}
+    GROUP BY date, asset
+    ON CONFLICT(day, asset) DO UPDATE SET
+        sum_sentiment = sum_sentiment + excluded.sum_sentiment,
+        count_used = count_used + excluded.count_used,
+        sum_conf = sum_conf + excluded.sum_conf,
+        sum_conf_sentiment = sum_conf_sentiment + excluded.sum_conf_sentiment,
+        avg_sentiment = (sum_sentiment + excluded.sum_sentiment) / (count_used + excluded.count_used),
+        updated_at = excluded.updated_at
+    """, params)
+    set_state(conn, "daily_last_id", max_id)
+    set_state(conn, "daily_min_abs", MIN_ABS_FOR_DAILY)
+    return touched
+
+ROLLING_COLUMNS = ["day", "asset", "mean_7d", "mean_30d", "ewma", "conf_mean", "conf_mean_7d",
+                   "conf_mean_30d", "count_7d", "count_30d"]
+
+def update_rolling(conn, touched: list[tuple[str, str]]) -> int:
+    """Refresh sentiments_rolling for each touched asset from its earliest touched day on.
+
+    Rolling means are count-weighted over calendar windows (the day and the 6 / 29
+    before it); conf_* weight each article by its FinBERT confidence. The EWMA
+    runs over daily means, decaying by (1 - alpha) per calendar day. Everything
+    after a touched day is rewritten because both windows and EWMA look back.
+    Returns the number of rows written.
+    """
+    import numpy as np
+
+    rebuilt = get_state(conn, "daily_rebuilt_at")
+    if get_state(conn, "rolling_rebuilt_at") != rebuilt:
+        conn.execute("DELETE FROM sentiments_rolling")
+        starts = dict(conn.execute("SELECT asset, MIN(day) FROM sentiments_daily GROUP BY asset"))
+        set_state(conn, "rolling_rebuilt_at", rebuilt)
     else:
-        daily = raw_use.groupby([raw_use["date"].dt.strftime("%Y-%m-%d"), "asset"]).agg(
-            avg_sentiment=("sentiment","mean"),
-            count_used=("sentiment","size")
-        ).reset_index().rename(columns={"date":"day"})
-    prev = pd.read_sql_query("SELECT * FROM sentiments_daily", conn)
-    for _, r in daily.iterrows():
-        conn.execute(
-            "INSERT OR REPLACE INTO sentiments_daily (day, asset, avg_sentiment, count_used) VALUES (?, ?, ?, ?)",
-            (r["day"], r["asset"], float(r["avg_sentiment"]), int(r["count_used"])))
-    conn.commit()
-    return daily
+        starts = {}
+        for day, asset in touched:
+            starts[asset] = min(day, starts.get(asset, day))
+    alpha = 2 / (EWMA_SPAN_DAYS + 1)
+    written = 0
+    for asset, start in starts.items():
+        start_ord = date.fromisoformat(start).toordinal()
+        lo = date.fromordinal(start_ord - 29).isoformat()
+        rows = conn.execute("""
+        SELECT day, sum_sentiment, count_used, sum_conf, sum_conf_sentiment FROM sentiments_daily
+        WHERE asset = ? AND day >= ? ORDER BY day
+        """, (asset, lo)).fetchall()
+        conn.execute("DELETE FROM sentiments_rolling WHERE asset = ? AND day >= ?", (asset, start))
+        if not rows:
+            continue
+        days = np.array([date.fromisoformat(r[0]).toordinal() for r in rows])
+        # columns: sum_sentiment, count_used, sum_conf, sum_conf_sentiment
+        sums = np.array([r[1:] for r in rows], dtype=np.float64)
+        np.nan_to_num(sums, copy=False)
+        cum = np.vstack([np.zeros(4), np.cumsum(sums, axis=0)])
+        win = {w: cum[1:] - cum[np.searchsorted(days, days - (w - 1))] for w in (7, 30)}
+        with np.errstate(divide="ignore", invalid="ignore"):
+            mean = {w: win[w][:, 0] / win[w][:, 1] for w in win}
+            conf = {w: np.where(win[w][:, 2] > 0, win[w][:, 3] / win[w][:, 2], np.nan) for w in win}
+            conf_day = np.where(sums[:, 2] > 0, sums[:, 3] / sums[:, 2], np.nan)
+            daily = sums[:, 0] / sums[:, 1]
+
+        first = int(np.searchsorted(days, start_ord))
+        prev = conn.execute("""
+        SELECT day, ewma FROM sentiments_rolling WHERE asset = ? AND day < ? ORDER BY day DESC LIMIT 1
+        """, (asset, start)).fetchone()
+        prev_ord, value = (date.fromisoformat(prev[0]).toordinal(), prev[1]) if prev else (None, None)
+        ewma = np.empty(len(rows))
+        for i in range(first, len(rows)):
+            keep = 0.0 if value is None else (1 - alpha) ** (days[i] - prev_ord)
+            value = keep * (value or 0.0) + (1 - keep) * daily[i]
+            ewma[i], prev_ord = value, days[i]
+
+        cols = [mean[7], mean[30], ewma, conf_day, conf[7], conf[30]]
+        values = [[None if x != x else x for x in c[first:].tolist()] for c in cols]
+        counts = [win[w][first:, 1].astype(int).tolist() for w in (7, 30)]
+        out = [(rows[first + i][0], asset, *v) for i, v in enumerate(zip(*values, *counts))]
+        conn.executemany(
+            f"INSERT INTO sentiments_rolling ({', '.join(ROLLING_COLUMNS)}, updated_at) "
+            f"VALUES ({', '.join('?' * len(ROLLING_COLUMNS))}, {storage.NOW_SQL})", out)
+        written += len(out)
+    return written
+
+def iter_csv_rows(path: Path = CSV_PATH) -> Iterator[dict]:
+    """Stream rows of a news CSV. The asset column is optional (tagged later)."""
+    with open(path, newline="", encoding="utf-8") as f:
+        reader = csv.DictReader(f)
+        needed = CSV_COLUMNS - {"asset"}
+        if not needed.issubset(reader.fieldnames or []):
+            raise ValueError(f"CSV must include columns: {CSV_COLUMNS}")
+        yield from reader
 
 def load_csv_rows() -> list[dict]:
     if not CSV_PATH.exists():
         return []
-    df = pd.read_csv(CSV_PATH, encoding="utf-8")
-    needed = {"date","source","asset","title","text"}
-    if not needed.issubset(df.columns):
-        raise ValueError(f"CSV must include columns: {needed}")
-    return df.to_dict(orient="records")
-
-def main():
-    conn = sqlite3.connect(DB_PATH)
+    return list(iter_csv_rows(CSV_PATH))
+
+def tag_assets(rows: Iterable[dict]) -> Iterator[dict]:
+    """Pass through rows that carry an asset; fan out the rest to every matched asset."""
+    for row in rows:
+        if row.get("asset"):
+            yield row
+            continue
+        for asset in infer_assets(row.get("title") or "", row.get("text") or ""):
+            yield dict(row, asset=asset)
+
+def micro_batches(rows: Iterable, size: int) -> Iterator[list]:
+    it = iter(rows)
+    while batch := list(islice(it, size)):
+        yield batch
+
+def ingest(conn, rows: Iterable[dict], batch_size: int = INGEST_BATCH_SIZE,
+           checkpoint: str | None = None) -> tuple[int, int]:
+    """Run source -> asset tagging -> dedup -> scoring -> SQLite in micro-batches.
+
+    Memory is bounded by batch_size, not by the input. With a checkpoint key the
+    number of consumed source rows is stored in etl_state after every batch, and
+    a later call with the same key skips them.
+    """
+    done = int(get_state(conn, checkpoint, 0)) if checkpoint else 0
+    inserted = skipped = 0
+    for batch in micro_batches(islice(rows, done, None), batch_size):
+        with write_txn(conn):
+            ins, sk = upsert_news(conn, list(tag_assets(batch)))
+            done += len(batch)
+            if checkpoint:
+                set_state(conn, checkpoint, done)
+        inserted += ins
+        skipped += sk
+    return inserted, skipped
+
+def parse_args(argv=None):
+    ap = argparse.ArgumentParser(description="RSS + CSV -> FinBERT/lexicon -> SQLite")
+    ap.add_argument("--full-rebuild", action="store_true",
+                    help="recompute sentiments_daily from all of news_raw")
+    ap.add_argument("--backfill", type=Path, metavar="CSV",
+                    help="stream a (large) news CSV instead of the sample CSV + RSS; resumable")
+    ap.add_argument("--restart", action="store_true", help="ignore the --backfill checkpoint")
+    ap.add_argument("--batch-size", type=int, default=INGEST_BATCH_SIZE)
+    ap.add_argument("--workers", type=int, default=FINBERT_WORKERS,
+                    help=f"FinBERT worker processes for inputs of {FINBERT_PARALLEL_MIN}+ texts (0 = in-process)")
+    ap.add_argument("--scorer", choices=SCORERS, default=SCORER,
+                    help="lexicon skips loading transformers/torch entirely")
+    ap.add_argument("--aggregate-only", action="store_true",
+                    help="skip CSV/RSS ingestion; only fold new news_raw rows into sentiments_daily")
+    ap.add_argument("--metrics", action="store_true", help="print the per-stage timing summary")
+    ap.add_argument("--profile", type=Path, metavar="PATH",
+                    help="profile this run: .html uses pyinstrument if installed, anything else cProfile")
+    ap.add_argument("--daemon", action="store_true",
+                    help="keep running: poll CSV + RSS every --interval seconds with the model and DB kept warm")
+    ap.add_argument("--interval", type=float, default=DAEMON_INTERVAL)
+    ap.add_argument("--jitter", type=float, default=DAEMON_JITTER, help="random extra delay per cycle, seconds")
+    ap.add_argument("--port", type=int, default=DAEMON_PORT, help="daemon: /healthz + /metrics port (0 = off)")
+    args = ap.parse_args(argv)
+    if args.scorer not in SCORERS:
+        ap.error(f"scorer must be one of {SCORERS}, got {args.scorer!r}")
+    if args.aggregate_only and args.backfill:
+        ap.error("--aggregate-only can't be combined with --backfill")
+    if args.daemon and (args.backfill or args.profile):
+        ap.error("--daemon can't be combined with --backfill or --profile")
+    return args
+
+def run_once(conn, args):
+    if args.backfill:
+        key = f"checkpoint:{args.backfill.resolve()}"
+        if args.restart:
+            set_state(conn, key, 0)
+        rows = METRICS.timed_iter("csv_read", iter_csv_rows(args.backfill))
+        res = ingest(conn, rows, args.batch_size, checkpoint=key)
+        print("Backfill: inserted %d, skipped %d" % res)
+    elif not args.aggregate_only:
+        csv_rows = METRICS.timed_iter("csv_read", iter_csv_rows(CSV_PATH) if CSV_PATH.exists() else [])
+        print("CSV: inserted %d, skipped %d" % ingest(conn, csv_rows, args.batch_size))
+        cache = load_rss_cache(conn)
+        rss_rows = METRICS.timed_iter("rss_fetch", iter_rss_rows(cache) if USE_RSS else [])
+        print("RSS: inserted %d, skipped %d" % ingest(conn, rss_rows, args.batch_size))
+        save_rss_cache(conn, cache)
+    recompute_daily(conn, full_rebuild=args.full_rebuild)
+
+def profiled(path: Path, fn, *a):
+    if path.suffix == ".html":
+        try:
+            from pyinstrument import Profiler
+        except ImportError:
+            Profiler = None
+        if Profiler is not None:
+            prof = Profiler()
+            prof.start()
+            try:
+                return fn(*a)
+            finally:
+                prof.stop()
+                path.write_text(prof.output_html(), encoding="utf-8")
+                print("Profile:", path)
+        path = path.with_suffix(".prof")
+    import cProfile
+    prof = cProfile.Profile()
+    try:
+        return prof.runcall(fn, *a)
+    finally:
+        prof.dump_stats(path)
+        print("Profile:", path)
+
+# ---------- daemon ----------
+class DaemonState:
+    """What /healthz and /metrics report; updated by the loop, read by the HTTP thread."""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.started = time.time()
+        self.cycles = 0
+        self.errors = 0
+        self.last_ok: float | None = None
+        self.last_error: str | None = None
+        self.last_seconds: float | None = None
+        self.next_run: float | None = None
+        self.stages: dict[str, dict] = {}
+        self.lock = threading.Lock()
+
+    def healthy(self) -> bool:
+        # a cycle may overrun; unhealthy only once ~3 cycles passed without a good one
+        ref = self.last_ok or self.started
+        return time.time() - ref < 3 * self.interval + 60
+
+    def health(self) -> dict:
+        with self.lock:
+            return {"status": "ok" if self.healthy() else "stale", "cycles": self.cycles, "errors": self.errors,
+                    "last_ok": self.last_ok, "last_error": self.last_error,
+                    "last_cycle_seconds": self.last_seconds, "next_run": self.next_run}
+
+    def prometheus(self) -> str:
+        with self.lock:
+            lines = [
+                f"etl_cycles_total {self.cycles}",
+                f"etl_cycle_errors_total {self.errors}",
+                f"etl_last_success_timestamp_seconds {self.last_ok or 0}",
+                f"etl_last_cycle_seconds {self.last_seconds or 0}",
+                f"etl_peak_rss_mb {peak_rss_mb() or 0}",
+            ]
+            for name, st in self.stages.items():
+                lines.append(f'etl_stage_seconds{{stage="{name}"}} {st["seconds"]:.6f}')
+                lines.append(f'etl_stage_rows{{stage="{name}"}} {st["rows_in"] or st["rows_out"]}')
+        return "\n".join(lines) + "\n"
+
+def serve_health(state: DaemonState, port: int) -> ThreadingHTTPServer:
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path == "/healthz":
+                body, ctype = json.dumps(state.health()), "application/json"
+                code = 200 if state.healthy() else 503
+            elif self.path == "/metrics":
+                body, ctype, code = state.prometheus(), "text/plain; version=0.0.4", 200
+            else:
+                body, ctype, code = "not found", "text/plain", 404
+            data = body.encode("utf-8")
+            self.send_response(code)
+            self.send_header("Content-Type", ctype)
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, *a):
+            pass
+
+    server = ThreadingHTTPServer(("0.0.0.0", port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f"Health: http://0.0.0.0:{port}/healthz, /metrics")
+    return server
+
+def run_daemon(conn, args):
+    """Run a cycle every interval (+ jitter) until SIGTERM/SIGINT; the cycle in progress always finishes."""
+    stop = threading.Event()
+
+    def on_signal(signum, frame):
+        print(f"Signal {signum}: stopping after the current cycle")
+        stop.set()
+
+    signal.signal(signal.SIGTERM, on_signal)
+    signal.signal(signal.SIGINT, on_signal)
+    state = DaemonState(args.interval)
+    server = serve_health(state, args.port) if args.port else None
+    try:
+        while not stop.is_set():
+            METRICS.reset()
+            t0 = time.perf_counter()
+            try:
+                run_once(conn, args)
+                METRICS.save(conn)
+                ok, err = time.time(), None
+            except Exception as e:  # keep the daemon alive; the next cycle retries
+                if conn.in_transaction:
+                    conn.rollback()
+                ok, err = None, f"{type(e).__name__}: {e}"
+                print("ERROR: cycle failed:", err)
+            args.full_rebuild = False  # only the first cycle
+            delay = args.interval + random.uniform(0, max(args.jitter, 0))
+            with state.lock:
+                state.cycles += 1
+                state.last_seconds = round(time.perf_counter() - t0, 3)
+                state.stages = {k: dict(v) for k, v in METRICS.stages.items()}
+                state.next_run = time.time() + delay
+                if err:
+                    state.errors += 1
+                    state.last_error = err
+                else:
+                    state.last_ok = ok
+            print(f"[{datetime.utcnow().isoformat(timespec='seconds')}] cycle {state.cycles} "
+                  f"took {state.last_seconds:.1f}s; next in {delay:.0f}s")
+            if args.metrics:
+                print(METRICS.summary())
+            stop.wait(delay)
+    finally:
+        if server is not None:
+            server.shutdown()
+
+def main(argv=None):
+    global SCORER, FINBERT_WORKERS
+    args = parse_args(argv)
+    SCORER, FINBERT_WORKERS = args.scorer, args.workers
+    if args.daemon:
+        conn = storage.connect(DB_PATH)
+        ensure_tables(conn)
+        try:
+            run_daemon(conn, args)
+        finally:
+            conn.close()
+        print(f"ETL daemon stopped. DB: {DB_PATH}")
+        return
+    METRICS.reset()
+    conn = storage.connect(DB_PATH)
     ensure_tables(conn)
-    csv_rows = load_csv_rows(); upsert_news(conn, csv_rows)
-    rss_rows = fetch_rss_rows() if USE_RSS else []
-    upsert_news(conn, rss_rows)
-    recompute_daily(conn)
+    if args.profile:
+        profiled(args.profile, run_once, conn, args)
+    else:
+        run_once(conn, args)
+    METRICS.save(conn)
     conn.close()
+    if args.metrics:
+        print(METRICS.summary())
     print(f"ETL complete. DB: {DB_PATH}")
 
 if __name__ == "__main__":
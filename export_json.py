@@ -1,18 +1,23 @@
-import sqlite3, json
+import argparse
+import gzip
+import hashlib
+import json
+import sqlite3
+from datetime import datetime
 from pathlib import Path
 import pandas as pd
 
+import storage
+from app import columnar
+
 DB = Path("data/sentiment.db")
 OUT = Path("data/daily_sentiment.json")
+COLUMNAR_OUT = Path("data/daily_sentiment.columnar.json")
+PARQUET_OUT = Path("data/daily_sentiment.parquet")
+EXPORT_DIR = Path("data/export")
 
-def main():
-    if not DB.exists():
-        OUT.write_text("[]", encoding="utf-8")
-        print("No DB yet. Wrote empty JSON.")
-        return
-    conn = sqlite3.connect(DB)
+def export_full(conn):
     df = pd.read_sql_query("SELECT day, asset, avg_sentiment, count_used FROM sentiments_daily ORDER BY day, asset", conn)
-    conn.close()
     if df.empty:
         OUT.write_text("[]", encoding="utf-8")
         print("No data in DB. Wrote empty JSON.")
@@ -21,5 +26,143 @@ def main():
     OUT.write_text(df.to_json(orient="records", force_ascii=False), encoding="utf-8")
     print("Wrote:", OUT)
 
+# ---------- columnar export (see app/columnar.py) ----------
+def export_columnar(conn, parquet: bool = False):
+    rows = conn.execute("SELECT day, asset, avg_sentiment, count_used FROM sentiments_daily ORDER BY day, asset").fetchall()
+    day, asset, avg, count = zip(*rows) if rows else ((), (), (), ())
+    COLUMNAR_OUT.write_bytes(columnar.dumps(columnar.encode(day, asset, avg, count)))
+    print("Wrote:", COLUMNAR_OUT)
+    if not parquet:
+        return
+    try:
+        columnar.write_parquet(PARQUET_OUT, day, asset, avg, count)
+        print("Wrote:", PARQUET_OUT)
+    except ImportError:
+        print("WARN: pyarrow not installed; skipping", PARQUET_OUT)
+
+# ---------- sharded, incremental export ----------
+# data/export/manifest.json   {watermark, shard_by, latest, shards: {key: {path, sha256, rows, bytes}}}
+# data/export/latest.json     {"day": ..., "BTC": 0.12, ..., "counts": {...}}  (post_summary's dict format)
+# data/export/daily/<key>.json[.gz]  records like daily_sentiment.json, one file per month or asset
+
+SHARD_SQL = {
+    "month": ("substr(day, 1, 7)", "day BETWEEN ? || '-00' AND ? || '-99'"),
+    "asset": ("asset", "asset = ?"),
+}
+
+def _dumps(obj) -> bytes:
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+def _records(rows) -> list[dict]:
+    return [{"day": d, "asset": a, "avg_sentiment": round(v, 10), "count_used": n} for d, a, v, n in rows]
+
+def _write(path: Path, data: bytes, gz: bool):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(data)
+    if gz:
+        # mtime=0 keeps the .gz bytes stable, so unchanged shards don't churn in git
+        Path(f"{path}.gz").write_bytes(gzip.compress(data, mtime=0))
+
+def _daily_rebuilt_at(conn):
+    try:
+        row = conn.execute("SELECT value FROM etl_state WHERE key = 'daily_rebuilt_at'").fetchone()
+    except sqlite3.OperationalError:  # no etl_state table yet
+        return None
+    return row[0] if row else None
+
+def export_shards(conn, out_dir: Path = EXPORT_DIR, shard_by: str = "month", gz: bool = False) -> list[str]:
+    """Rewrite only the shards whose rows changed since the last export. Returns the written keys."""
+    # one read snapshot: the new watermark must not pass rows this run didn't export
+    with storage.read_txn(conn):
+        return _export_shards(conn, out_dir, shard_by, gz)
+
+def _export_shards(conn, out_dir: Path, shard_by: str, gz: bool) -> list[str]:
+    key_sql, where_sql = SHARD_SQL[shard_by]
+    manifest_path = out_dir / "manifest.json"
+    manifest = json.loads(manifest_path.read_text(encoding="utf-8")) if manifest_path.exists() else {}
+    watermark = manifest.get("watermark")
+    rebuilt = _daily_rebuilt_at(conn)
+    full = (watermark is None or manifest.get("shard_by") != shard_by or manifest.get("gzip") != gz
+            or (rebuilt is not None and rebuilt > watermark))
+    if full:
+        keys = [r[0] for r in conn.execute(f"SELECT DISTINCT {key_sql} FROM sentiments_daily ORDER BY 1")]
+        shards = {}
+    else:
+        keys = [r[0] for r in conn.execute(
+            f"SELECT DISTINCT {key_sql} FROM sentiments_daily WHERE updated_at > ? ORDER BY 1", (watermark,))]
+        shards = manifest.get("shards", {})
+
+    written = []
+    for key in keys:
+        params = (key, key) if shard_by == "month" else (key,)
+        rows = conn.execute(f"""
+        SELECT day, asset, avg_sentiment, count_used FROM sentiments_daily
+        WHERE {where_sql} ORDER BY day, asset
+        """, params).fetchall()
+        data = _dumps(_records(rows))
+        sha = hashlib.sha256(data).hexdigest()
+        rel = f"daily/{key}.json"
+        if shards.get(key, {}).get("sha256") == sha and (out_dir / rel).exists():
+            continue
+        _write(out_dir / rel, data, gz)
+        shards[key] = {"path": rel, "sha256": sha, "rows": len(rows), "bytes": len(data)}
+        written.append(key)
+    if full:
+        for old in (out_dir / "daily").glob("*.json*") if (out_dir / "daily").exists() else []:
+            if old.name.split(".json")[0] not in shards:
+                old.unlink()
+
+    latest_day = conn.execute("SELECT MAX(day) FROM sentiments_daily").fetchone()[0]
+    latest = {"day": latest_day, "counts": {}}
+    for day, asset, v, n in conn.execute(
+            "SELECT day, asset, avg_sentiment, count_used FROM sentiments_daily WHERE day = ? ORDER BY asset",
+            (latest_day,)):
+        latest[asset] = round(v, 10)
+        latest["counts"][asset] = n
+    latest_data = _dumps(latest)
+    _write(out_dir / "latest.json", latest_data, gz)
+
+    manifest = {
+        "generated_at": datetime.utcnow().isoformat(timespec="seconds"),
+        "watermark": conn.execute("SELECT MAX(updated_at) FROM sentiments_daily").fetchone()[0] or watermark,
+        "shard_by": shard_by,
+        "gzip": gz,
+        "latest": {"path": "latest.json", "day": latest_day, "sha256": hashlib.sha256(latest_data).hexdigest()},
+        "rows": sum(s["rows"] for s in shards.values()),
+        "shards": dict(sorted(shards.items())),
+    }
+    _write(manifest_path, json.dumps(manifest, indent=1).encode("utf-8"), False)
+    print(f"Shards: {len(written)} rewritten / {len(shards)} total -> {out_dir}")
+    return written
+
+def parse_args(argv=None):
+    ap = argparse.ArgumentParser(description="Export sentiments_daily for the web")
+    ap.add_argument("--shards", action="store_true",
+                    help=f"also write incremental shards + latest.json + manifest.json under {EXPORT_DIR}")
+    ap.add_argument("--shard-by", choices=list(SHARD_SQL), default="month")
+    ap.add_argument("--gzip", action="store_true", help="write precompressed .gz next to each shard")
+    ap.add_argument("--out-dir", type=Path, default=EXPORT_DIR)
+    ap.add_argument("--no-full", action="store_true", help=f"skip rewriting {OUT}")
+    ap.add_argument("--columnar", action="store_true", help=f"also write {COLUMNAR_OUT}")
+    ap.add_argument("--parquet", action="store_true", help=f"also write {PARQUET_OUT} (needs pyarrow)")
+    return ap.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    if not DB.exists():
+        OUT.write_text("[]", encoding="utf-8")
+        print("No DB yet. Wrote empty JSON.")
+        return
+    conn = storage.connect(DB, readonly=True)
+    try:
+        if not args.no_full:
+            export_full(conn)
+        if args.columnar or args.parquet:
+            export_columnar(conn, args.parquet)
+        if args.shards:
+            export_shards(conn, args.out_dir, args.shard_by, args.gzip)
+    finally:
+        conn.close()
+
 if __name__ == "__main__":
     main()
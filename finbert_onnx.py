@@ -0,0 +1,85 @@
+# finbert_onnx.py
+# Export FinBERT to ONNX (+ dynamic int8), check score drift against torch, and
+# benchmark each backend. Select the backend with `finbert_backend` in app/config.yaml.
+#
+#   python finbert_onnx.py export [--model M]
+#   python finbert_onnx.py parity [--model M] [--rows N]
+#   python finbert_onnx.py bench  [--model M] [--rows N] [--backends torch onnx onnx-int8]
+#
+# --model may be a local directory, e.g. a tiny test model for quick checks.
+
+import argparse
+import time
+
+from etl_to_sqlite import (FINBERT_BACKENDS, FINBERT_MODEL, ONNX_FILE, FinbertScorer,
+                           load_csv_rows, onnx_model_dir)
+
+QUANT_ARCHS = ("avx2", "avx512", "avx512_vnni", "arm64")
+
+def export(model: str, int8: bool = True, arch: str = "avx2"):
+    from optimum.onnxruntime import ORTModelForSequenceClassification, ORTQuantizer
+    from optimum.onnxruntime.configuration import AutoQuantizationConfig
+    from transformers import AutoTokenizer
+
+    out = onnx_model_dir(model, "onnx")
+    ort_model = ORTModelForSequenceClassification.from_pretrained(model, export=True)
+    ort_model.save_pretrained(out)
+    AutoTokenizer.from_pretrained(model).save_pretrained(out)
+    print("Wrote:", out / ONNX_FILE["onnx"])
+    if not int8:
+        return
+    out8 = onnx_model_dir(model, "onnx-int8")
+    qconfig = getattr(AutoQuantizationConfig, arch)(is_static=False, per_channel=False)
+    ORTQuantizer.from_pretrained(ort_model).quantize(save_dir=out8, quantization_config=qconfig)
+    AutoTokenizer.from_pretrained(model).save_pretrained(out8)
+    print("Wrote:", out8 / ONNX_FILE["onnx-int8"])
+
+def sample_texts(n: int) -> list[str]:
+    base = [f"{r['title']} {r['text']}" for r in load_csv_rows()] or ["Bitcoin rallies as ETF optimism grows"]
+    return [base[i % len(base)] for i in range(n)]
+
+def available_backends(model: str, wanted=FINBERT_BACKENDS) -> list[str]:
+    return [b for b in wanted if b == "torch" or (onnx_model_dir(model, b) / ONNX_FILE[b]).exists()]
+
+def parity(model: str, rows: int):
+    texts = sample_texts(rows)
+    base = FinbertScorer(model=model, backend="torch").score(texts)
+    print(f"{'backend':<10} {'max_drift':>10} {'mean_drift':>10} {'sign_agree':>10}")
+    for backend in available_backends(model)[1:]:
+        got = FinbertScorer(model=model, backend=backend).score(texts)
+        drift = [abs(a - b) for a, b in zip(base, got)]
+        agree = sum((a > 0) - (a < 0) == (b > 0) - (b < 0) for a, b in zip(base, got)) / len(texts)
+        print(f"{backend:<10} {max(drift):>10.4f} {sum(drift) / len(drift):>10.4f} {agree:>10.1%}")
+
+def bench(model: str, rows: int, backends):
+    texts = sample_texts(rows)
+    print(f"{'backend':<10} {'load_s':>8} {'score_s':>8} {'texts/s':>10}")
+    for backend in available_backends(model, backends):
+        scorer = FinbertScorer(model=model, backend=backend)
+        t0 = time.perf_counter()
+        scorer.load()
+        scorer.score(texts[:8])  # warm-up
+        loaded = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        scorer.score(texts)
+        took = time.perf_counter() - t0
+        print(f"{backend:<10} {loaded:>8.2f} {took:>8.2f} {rows / took:>10,.1f}")
+
+def main():
+    ap = argparse.ArgumentParser(description="FinBERT ONNX export / parity / benchmark")
+    ap.add_argument("command", choices=["export", "parity", "bench"])
+    ap.add_argument("--model", default=FINBERT_MODEL)
+    ap.add_argument("--rows", type=int, default=256)
+    ap.add_argument("--no-int8", action="store_true", help="export: skip dynamic int8 quantization")
+    ap.add_argument("--arch", choices=QUANT_ARCHS, default="avx2", help="export: int8 kernel target")
+    ap.add_argument("--backends", nargs="+", choices=FINBERT_BACKENDS, default=list(FINBERT_BACKENDS))
+    args = ap.parse_args()
+    if args.command == "export":
+        export(args.model, int8=not args.no_int8, arch=args.arch)
+    elif args.command == "parity":
+        parity(args.model, args.rows)
+    else:
+        bench(args.model, args.rows, args.backends)
+
+if __name__ == "__main__":
+    main()
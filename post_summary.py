@@ -15,14 +15,30 @@ NEUTRAL_THRESH = 0.05
 DATA_URL = os.environ.get("DATA_URL", "").strip()
 ZAPIER_HOOK_URL = os.environ.get("ZAPIER_HOOK_URL", "").strip()
 
-def fetch_json(url: str):
+def fetch_bytes(url: str) -> bytes:
     if not url:
         raise ValueError("DATA_URL is empty")
     ctx = ssl.create_default_context()
     with urllib.request.urlopen(url, context=ctx, timeout=20) as resp:
-        raw = resp.read().decode("utf-8", "ignore")
+        raw = resp.read()
         print(f"DEBUG: downloaded bytes = {len(raw)}")
-        return json.loads(raw)
+        return raw
+
+def fetch_json(url: str):
+    return json.loads(fetch_bytes(url).decode("utf-8", "ignore"))
+
+def load_payload(raw: bytes):
+    # Parquet / columnar JSON (export_json.py --columnar) decode to arrays; anything else is plain JSON.
+    # app.columnar needs numpy, so it's imported only for those: the JSON path stays stdlib-only.
+    if raw[:4] == b"PAR1":
+        from app import columnar
+        return columnar.load(raw)
+    payload = json.loads(raw.decode("utf-8", "ignore"))
+    if isinstance(payload, dict) and "format" in payload and "columns" in payload:
+        from app import columnar
+        if columnar.is_columnar(payload):
+            return columnar.decode(payload)
+    return payload
 
 def pick_latest_day(rows):
     days = [r.get("day") for r in rows if isinstance(r, dict) and r.get("day")]
@@ -98,8 +114,12 @@ def post_to_zapier(text: str):
 
 if __name__ == "__main__":
     try:
-        payload = fetch_json(DATA_URL)
-        if isinstance(payload, list):
+        payload = load_payload(fetch_bytes(DATA_URL))
+        if isinstance(payload, dict) and "asset_codes" in payload:
+            from app import columnar
+            latest, vals = columnar.latest_values(payload)
+            msg = build_message(latest, vals)
+        elif isinstance(payload, list):
             latest = pick_latest_day(payload)
             vals = values_for_day(payload, latest)
             msg = build_message(latest, vals)
@@ -0,0 +1,225 @@
+# storage.py
+# Shared SQLite layer for the ETL and exporters: tuned connections, one write
+# transaction per stage, and versioned schema migrations (PRAGMA user_version).
+
+import hashlib
+import sqlite3
+from contextlib import contextmanager
+from pathlib import Path
+
+PRAGMAS = {
+    "journal_mode": "WAL",      # readers (dashboards, export) don't block the ETL writer
+    "synchronous": "NORMAL",    # durable at checkpoints; safe with WAL
+    "busy_timeout": 30000,
+    "temp_store": "MEMORY",
+    "cache_size": -65536,       # 64 MiB page cache
+    "mmap_size": 268435456,
+}
+
+# UTC timestamp with milliseconds; sorts as text
+NOW_SQL = "strftime('%Y-%m-%dT%H:%M:%f', 'now')"
+
+def connect(path, readonly: bool = False) -> sqlite3.Connection:
+    """Open sentiment.db in autocommit mode; group writes with write_txn()."""
+    if readonly:
+        conn = sqlite3.connect(f"{Path(path).resolve().as_uri()}?mode=ro", uri=True,
+                               isolation_level=None, timeout=30)
+    else:
+        conn = sqlite3.connect(path, isolation_level=None, timeout=30)
+    for key, value in PRAGMAS.items():
+        if readonly and key == "journal_mode":
+            continue
+        conn.execute(f"PRAGMA {key}={value}")
+    return conn
+
+@contextmanager
+def write_txn(conn: sqlite3.Connection):
+    """One IMMEDIATE write transaction; joins the outer one when already inside a transaction."""
+    if conn.in_transaction:
+        yield conn
+        return
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        yield conn
+    except BaseException:
+        conn.rollback()
+        raise
+    conn.commit()
+
+@contextmanager
+def read_txn(conn: sqlite3.Connection):
+    """One read snapshot across several SELECTs, so a concurrent ETL commit can't land between them."""
+    if conn.in_transaction:
+        yield conn
+        return
+    conn.execute("BEGIN")
+    try:
+        yield conn
+    finally:
+        conn.rollback()  # nothing was written; just ends the snapshot
+
+def content_hash(date, asset, title) -> str:
+    """Stable hash of the natural `date|asset|title` key of a news row."""
+    return hashlib.sha1(f"{date}|{asset}|{title}".encode("utf-8")).hexdigest()
+
+def _columns(conn, table: str) -> set[str]:
+    return {r[1] for r in conn.execute(f"PRAGMA table_info({table})")}
+
+def _base_schema(conn):
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS news_raw (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        date TEXT,
+        source TEXT,
+        asset TEXT,
+        title TEXT,
+        text TEXT,
+        sentiment REAL,
+        confidence REAL,
+        content_hash TEXT
+    )
+    """)
+    if "content_hash" not in _columns(conn, "news_raw"):
+        conn.execute("ALTER TABLE news_raw ADD COLUMN content_hash TEXT")
+    missing = conn.execute("SELECT id, date, asset, title FROM news_raw WHERE content_hash IS NULL").fetchall()
+    if missing:
+        conn.executemany("UPDATE news_raw SET content_hash = ? WHERE id = ?",
+                         [(content_hash(d, a, t), i) for i, d, a, t in missing])
+    conn.execute("DROP INDEX IF EXISTS idx_news_raw_content_hash")
+    conn.execute("""
+    DELETE FROM news_raw WHERE id NOT IN (SELECT MIN(id) FROM news_raw GROUP BY content_hash)
+    """)
+    conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS ux_news_raw_content_hash ON news_raw(content_hash)")
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS sentiments_daily (
+        day TEXT,
+        asset TEXT,
+        avg_sentiment REAL,
+        count_used INTEGER,
+        sum_sentiment REAL,
+        PRIMARY KEY (day, asset)
+    )
+    """)
+    if "sum_sentiment" not in _columns(conn, "sentiments_daily"):
+        conn.execute("ALTER TABLE sentiments_daily ADD COLUMN sum_sentiment REAL")
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS rss_cache (
+        url TEXT PRIMARY KEY,
+        etag TEXT,
+        modified TEXT,
+        fetched_at TEXT
+    )
+    """)
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS score_cache (
+        text_hash TEXT,
+        model_key TEXT,
+        finbert REAL,
+        lexicon REAL,
+        last_used INTEGER,
+        PRIMARY KEY (text_hash, model_key)
+    )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_score_cache_last_used ON score_cache(last_used)")
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS etl_runs (
+        run_id TEXT,
+        started_at TEXT,
+        stage TEXT,
+        calls INTEGER,
+        seconds REAL,
+        rows_in INTEGER,
+        rows_out INTEGER,
+        rows_per_s REAL,
+        peak_rss_mb REAL,
+        PRIMARY KEY (run_id, stage)
+    )
+    """)
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS etl_state (
+        key TEXT PRIMARY KEY,
+        value TEXT
+    )
+    """)
+
+def _day_asset_indexes(conn):
+    # covering indexes for the per-day / per-asset reads of news_raw and sentiments_daily
+    conn.execute("""
+    CREATE INDEX IF NOT EXISTS idx_news_raw_date_asset
+        ON news_raw(date, asset, sentiment, confidence)
+    """)
+    conn.execute("""
+    CREATE INDEX IF NOT EXISTS idx_news_raw_asset_date
+        ON news_raw(asset, date, sentiment, confidence)
+    """)
+    conn.execute("""
+    CREATE INDEX IF NOT EXISTS idx_sentiments_daily_asset_day
+        ON sentiments_daily(asset, day, avg_sentiment, count_used)
+    """)
+
+def _daily_updated_at(conn):
+    # lets exporters find the (day, asset) groups changed since their last run
+    if "updated_at" not in _columns(conn, "sentiments_daily"):
+        conn.execute("ALTER TABLE sentiments_daily ADD COLUMN updated_at TEXT")
+    conn.execute(f"UPDATE sentiments_daily SET updated_at = {NOW_SQL} WHERE updated_at IS NULL")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_sentiments_daily_updated_at ON sentiments_daily(updated_at)")
+
+def _near_dup(conn):
+    # dup_of points a republished copy of a story at its canonical news_raw row;
+    # near_dup holds the SimHash of every canonical row (see app/near_dup.py)
+    if "dup_of" not in _columns(conn, "news_raw"):
+        conn.execute("ALTER TABLE news_raw ADD COLUMN dup_of INTEGER")
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS near_dup (
+        news_id INTEGER PRIMARY KEY,
+        asset TEXT,
+        day TEXT,
+        simhash INTEGER
+    )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_near_dup_asset_day ON near_dup(asset, day, simhash)")
+
+def _rolling(conn):
+    # confidence-weighted daily sums + the rolling-window table the ETL keeps current
+    for col in ("sum_conf", "sum_conf_sentiment"):
+        if col not in _columns(conn, "sentiments_daily"):
+            conn.execute(f"ALTER TABLE sentiments_daily ADD COLUMN {col} REAL")
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS sentiments_rolling (
+        day TEXT,
+        asset TEXT,
+        mean_7d REAL,
+        mean_30d REAL,
+        ewma REAL,
+        conf_mean REAL,
+        conf_mean_7d REAL,
+        conf_mean_30d REAL,
+        count_7d INTEGER,
+        count_30d INTEGER,
+        updated_at TEXT,
+        PRIMARY KEY (day, asset)
+    )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_sentiments_rolling_asset_day ON sentiments_rolling(asset, day)")
+    # the new sums need one full rebuild of sentiments_daily
+    conn.execute("DELETE FROM etl_state WHERE key = 'daily_last_id'")
+
+# Append only; a database at user_version N has run the first N entries.
+MIGRATIONS = [
+    _base_schema,
+    _day_asset_indexes,
+    _daily_updated_at,
+    _near_dup,
+    _rolling,
+]
+
+def schema_version(conn) -> int:
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+def migrate(conn):
+    for version, step in enumerate(MIGRATIONS, start=1):
+        if schema_version(conn) >= version:
+            continue
+        with write_txn(conn):
+            step(conn)
+            conn.execute(f"PRAGMA user_version = {version}")
@@ -1,8 +1,10 @@
 # watch_tron_usdt.py
-import os, json, requests, uuid
+import os, json, uuid
 from datetime import datetime, timedelta
 from pathlib import Path
 
+from app import http_client, license_store
+
 # ------------------ ENV + DEFAULTS ------------------ #
 
 def _parse_float_env(key, default_str):
@@ -22,7 +24,19 @@ MONTHLY_AMOUNT   = _parse_float_env("MONTHLY_AMOUNT", "15.0")
 QUARTERLY_AMOUNT = _parse_float_env("QUARTERLY_AMOUNT", "40.0")
 AMOUNT_EPS       = _parse_float_env("AMOUNT_EPS", "0.05")
 
+GAS_TIMEOUT = (5, 30)  # Apps Script cold starts are slow
+
+TRONSCAN_HOSTS    = ["https://apilist.tronscan.org", "https://apilist.tronscanapi.com"]  # second is the fallback
+TRC20_PAGE_LIMIT  = 50
+TRC20_MAX_PAGES   = int(_parse_float_env("TRC20_MAX_PAGES", "200"))
+BOOTSTRAP_HOURS   = _parse_float_env("TRC20_BOOTSTRAP_HOURS", "72")  # look-back when there is no cursor yet
+OVERLAP_MS        = int(_parse_float_env("TRC20_OVERLAP_SECONDS", "120") * 1000)  # re-read behind the mark (indexer lag)
+# a memo'd USDT transfer with no matching order yet (order row written after the
+# pending snapshot, amount typo, ...) holds the cursor for this long so it is retried
+UNMATCHED_RETRY_MS = int(_parse_float_env("TRC20_UNMATCHED_RETRY_HOURS", "24") * 3600 * 1000)
+
 STATE_PATH = Path(".state/processed_txids.json")
+CURSOR_PATH = Path(".state/trc20_cursor.json")  # {"wallet", "block_ts", "txid"}: high-water mark
 STATE_PATH.parent.mkdir(parents=True, exist_ok=True)
 
 # ------------------ BASIC HELPERS ------------------ #
@@ -38,6 +52,19 @@ def load_state():
 def save_state(s):
     STATE_PATH.write_text(json.dumps(sorted(list(s))))
 
+def load_cursor_ms():
+    """block_ts (ms) to resume from; a fresh/other-wallet cursor starts BOOTSTRAP_HOURS back."""
+    try:
+        c = json.loads(CURSOR_PATH.read_text())
+        if c.get("wallet") == WALLET_ADDRESS:
+            return int(c["block_ts"])
+    except Exception:
+        pass
+    return int((datetime.now() - timedelta(hours=BOOTSTRAP_HOURS)).timestamp() * 1000)
+
+def save_cursor(block_ts, txid):
+    CURSOR_PATH.write_text(json.dumps({"wallet": WALLET_ADDRESS, "block_ts": block_ts, "txid": txid}))
+
 def plan_from_amount(amount):
     if abs(amount - MONTHLY_AMOUNT) <= AMOUNT_EPS:
         return ("Monthly", 30)
@@ -65,14 +92,15 @@ def post_issue_license(email, license_key, plan, expires_at, txid, amount):
         "status": "active",
         "note": "autodetected_tx"
     }
-    r = requests.post(APPS_SCRIPT_URL, json=payload, timeout=30)
+    # not retried: a lost response may still have written the license row
+    r = http_client.post(APPS_SCRIPT_URL, json=payload, timeout=GAS_TIMEOUT, endpoint="gas:issue_license")
     r.raise_for_status()
     return r.json()
 
 def apps_get_pending():
     """Fetch pending orders"""
     url = f"{APPS_SCRIPT_URL}?pending=1&secret={APPS_SCRIPT_TOKEN}"
-    r = requests.get(url, timeout=30)
+    r = http_client.get(url, timeout=GAS_TIMEOUT, endpoint="gas:pending")
     r.raise_for_status()
     j = r.json()
     if not j.get("ok"):
@@ -92,71 +120,83 @@ def apps_get_pending():
 def apps_complete_pending(tax_id, txid):
     """Mark pending order as completed"""
     payload = { "token": APPS_SCRIPT_TOKEN, "action": "complete", "tax_id": tax_id, "txid": txid }
-    r = requests.post(APPS_SCRIPT_URL, json=payload, timeout=30)
+    r = http_client.post(APPS_SCRIPT_URL, json=payload, timeout=GAS_TIMEOUT,
+                         endpoint="gas:complete", idempotent=True)  # completing twice is a no-op
     r.raise_for_status()
     return r.json()
 
 # ------------------ FETCH TRON TX ------------------ #
 
-def fetch_trc20_transfers_to_me():
-    out = []
-    try:
-        url1 = f"https://apilist.tronscan.org/api/token_trc20/transfers?limit=50&toAddress={WALLET_ADDRESS}"
-        j = requests.get(url1, timeout=20).json()
-        for it in j.get("token_transfers", []):
-            out.append({
-                "txid": it.get("transaction_id") or it.get("hash"),
-                "to": it.get("to_address"),
-                "from": it.get("from_address"),
-                "contract": it.get("contract_address"),
-                "token_symbol": (it.get("token_info", {}) or {}).get("symbol") or it.get("symbol"),
-                "decimals": int((it.get("token_info", {}) or {}).get("decimals", 6) or 6),
-                "quant": it.get("quant", 0),
-                "ts": int(it.get("block_ts") or 0) // 1000,
-                "data": it.get("data") or it.get("memo") or ""
-            })
-    except Exception as e:
-        print("tronscan.org fetch error:", e)
-
-    # fallback
-    if not out:
+def _parse_transfer(it):
+    info = it.get("token_info", {}) or {}
+    return {
+        "txid": it.get("transaction_id") or it.get("hash"),
+        "to": it.get("to_address"),
+        "from": it.get("from_address"),
+        "contract": it.get("contract_address"),
+        "token_symbol": info.get("symbol") or it.get("symbol"),
+        "decimals": int(info.get("decimals", 6) or 6),
+        "quant": it.get("quant", 0),
+        "block_ts": int(it.get("block_ts") or 0),
+        "data": it.get("data") or it.get("memo") or ""
+    }
+
+def _fetch_since(host, since_ms):
+    """Page oldest-first through transfers with block_ts >= since_ms; yields one list of raw transfers per page."""
+    ids = set()
+    for page in range(TRC20_MAX_PAGES):
+        params = {"limit": TRC20_PAGE_LIMIT, "start": page * TRC20_PAGE_LIMIT, "sort": "timestamp",
+                  "toAddress": WALLET_ADDRESS, "start_timestamp": since_ms}
+        r = http_client.get(f"{host}/api/token_trc20/transfers", params=params,
+                            endpoint=f"{host.split('//')[-1]}:transfers")
+        r.raise_for_status()
+        items = r.json().get("token_transfers") or []
+        out = []
+        for it in items:
+            t = _parse_transfer(it)
+            # transfers arriving mid-scan land after the last page, so offsets stay put; ids is a safety net
+            if t["block_ts"] >= since_ms and t["txid"] not in ids:
+                ids.add(t["txid"])
+                out.append(t)
+        yield out
+        if len(items) < TRC20_PAGE_LIMIT:
+            return
+    print(f"[WARN] {host}: stopped after {TRC20_MAX_PAGES} pages; the rest is picked up next run")
+
+def _normalize(t):
+    if not t["txid"] or not t["to"]:
+        return None
+    dec = int(t.get("decimals", 6) or 6)
+    q = float(t.get("quant", 0) or 0)
+    amt = q / (10 ** dec) if dec >= 0 else q
+    return {
+        "txid": t["txid"],
+        "to": t["to"],
+        "from": t["from"],
+        "contract": t["contract"] or "",
+        "token_symbol": (t["token_symbol"] or "").upper(),
+        "amount": amt,
+        "ts": t["block_ts"] // 1000,
+        "block_ts": t["block_ts"],
+        "data": (t.get("data") or "").strip()
+    }
+
+def fetch_trc20_transfers_to_me(since_ms):
+    """Transfers to WALLET_ADDRESS at or after since_ms (ms), oldest first, one list per page.
+
+    A host failing mid-scan hands over to the next one, which resumes at the last
+    block_ts already yielded (the caller's seen set skips the repeats).
+    """
+    for host in TRONSCAN_HOSTS:
         try:
-            url2 = f"https://apilist.tronscanapi.com/api/token_trc20/transfers?limit=50&toAddress={WALLET_ADDRESS}"
-            j = requests.get(url2, timeout=20).json()
-            for it in j.get("token_transfers", []):
-                out.append({
-                    "txid": it.get("transaction_id") or it.get("hash"),
-                    "to": it.get("to_address"),
-                    "from": it.get("from_address"),
-                    "contract": it.get("contract_address"),
-                    "token_symbol": (it.get("token_info", {}) or {}).get("symbol") or it.get("symbol"),
-                    "decimals": int((it.get("token_info", {}) or {}).get("decimals", 6) or 6),
-                    "quant": it.get("quant", 0),
-                    "ts": int(it.get("block_ts") or 0) // 1000,
-                    "data": it.get("data") or it.get("memo") or ""
-                })
+            for raw in _fetch_since(host, since_ms):
+                txs = [n for n in map(_normalize, raw) if n]
+                if raw:
+                    since_ms = max(since_ms, max(t["block_ts"] for t in raw))
+                yield txs
+            return
         except Exception as e:
-            print("tronscanapi.com fetch error:", e)
-
-    # normalize
-    norm = []
-    for t in out:
-        if not t["txid"] or not t["to"]:
-            continue
-        dec = int(t.get("decimals", 6) or 6)
-        q = float(t.get("quant", 0) or 0)
-        amt = q / (10 ** dec) if dec >= 0 else q
-        norm.append({
-            "txid": t["txid"],
-            "to": t["to"],
-            "from": t["from"],
-            "contract": t["contract"] or "",
-            "token_symbol": (t["token_symbol"] or "").upper(),
-            "amount": amt,
-            "ts": t["ts"],
-            "data": (t.get("data") or "").strip()
-        })
-    return norm
+            print(f"{host} fetch error:", e)
 
 # ------------------ MAIN LOOP ------------------ #
 
@@ -170,89 +210,115 @@ def main():
 
     pending = apps_get_pending()
     seen = load_state()
-    txs = fetch_trc20_transfers_to_me()
-    if not txs:
-        print("No transfers found (or API offline).")
-        return
-
-    txs.sort(key=lambda x: x["ts"], reverse=True)
-    processed = 0
-
-    for tx in txs:
-        txid = tx["txid"]
-        if txid in seen:
-            continue
-
-        sym = (tx["token_symbol"] or "").upper()
-        contract = (tx.get("contract") or "").strip()
-
-        # filter USDT
-        if USDT_CONTRACT != "Tether_USDT_TRON":
-            if contract.lower() != USDT_CONTRACT.lower():
-                continue
-        else:
-            if sym != "USDT":
+    since_ms = load_cursor_ms()
+    print(f"Fetching transfers since block_ts={since_ms}")
+    fetched = processed = 0
+    failed = []     # transfers to retry next run: the cursor must not move past them
+    unmatched = []  # memo'd USDT transfers without a matching order (yet)
+
+    # oldest page first, so the cursor can move after every page and a run cut
+    # short by TRC20_MAX_PAGES still makes progress
+    for txs in fetch_trc20_transfers_to_me(since_ms - OVERLAP_MS):
+        fetched += len(txs)
+        for tx in txs:
+            txid = tx["txid"]
+            if txid in seen:
                 continue
 
-        amount = float(tx["amount"])
-        memo = (tx.get("data") or "").strip()
-        if not memo:
-            continue
+            sym = (tx["token_symbol"] or "").upper()
+            contract = (tx.get("contract") or "").strip()
 
-        tax_id = memo
-        key = tax_id.upper()
-        if key not in pending:
-            continue
+            # filter USDT
+            if USDT_CONTRACT != "Tether_USDT_TRON":
+                if contract.lower() != USDT_CONTRACT.lower():
+                    continue
+            else:
+                if sym != "USDT":
+                    continue
 
-        order = pending[key]
-        exp_amount = float(order.get("amount") or 0.0)
+            amount = float(tx["amount"])
+            memo = (tx.get("data") or "").strip()
+            if not memo:
+                continue
 
-        plan, days = plan_from_amount(amount)
-        if exp_amount > 0.0:
-            if abs(amount - exp_amount) > AMOUNT_EPS:
-                print(f"⚠️ TX {txid}: amount {amount} != expected {exp_amount} (tax_id={tax_id})")
+            tax_id = memo
+            key = tax_id.upper()
+            if key not in pending:
+                unmatched.append(tx)
                 continue
-            if abs(exp_amount - MONTHLY_AMOUNT) <= AMOUNT_EPS:
-                plan, days = "Monthly", 30
-            elif abs(exp_amount - QUARTERLY_AMOUNT) <= AMOUNT_EPS:
-                plan, days = "Quarterly", 90
+
+            order = pending[key]
+            exp_amount = float(order.get("amount") or 0.0)
+
+            plan, days = plan_from_amount(amount)
+            if exp_amount > 0.0:
+                if abs(amount - exp_amount) > AMOUNT_EPS:
+                    print(f"⚠️ TX {txid}: amount {amount} != expected {exp_amount} (tax_id={tax_id})")
+                    unmatched.append(tx)
+                    continue
+                if abs(exp_amount - MONTHLY_AMOUNT) <= AMOUNT_EPS:
+                    plan, days = "Monthly", 30
+                elif abs(exp_amount - QUARTERLY_AMOUNT) <= AMOUNT_EPS:
+                    plan, days = "Quarterly", 90
+                else:
+                    print(f"⚠️ TX {txid}: unknown amount {exp_amount}")
+                    unmatched.append(tx)
+                    continue
             else:
-                print(f"⚠️ TX {txid}: unknown amount {exp_amount}")
-                continue
-        else:
-            if not plan:
-                continue
+                if not plan:
+                    unmatched.append(tx)
+                    continue
 
-        email = order.get("email") or f"user+{tax_id.lower()}@example.com"
-        license_key = gen_license()
-        expires_at = (datetime.utcnow() + timedelta(days=days)).strftime("%Y-%m-%d")
+            email = order.get("email") or f"user+{tax_id.lower()}@example.com"
+            license_key = gen_license()
+            expires_at = (datetime.utcnow() + timedelta(days=days)).strftime("%Y-%m-%d")
 
-        print(f"✅ Match tax_id={tax_id} | plan={plan} | amount={amount}")
-        try:
-            jr = post_issue_license(
-                email=email,
-                license_key=license_key,
-                plan=plan,
-                expires_at=expires_at,
-                txid=txid,
-                amount=amount
-            )
-            print("→ AppsScript response:", jr)
+            print(f"✅ Match tax_id={tax_id} | plan={plan} | amount={amount}")
             try:
-                done = apps_complete_pending(tax_id, txid)
-                print("→ Completed pending:", done)
+                jr = post_issue_license(
+                    email=email,
+                    license_key=license_key,
+                    plan=plan,
+                    expires_at=expires_at,
+                    txid=txid,
+                    amount=amount
+                )
+                print("→ AppsScript response:", jr)
+                if jr.get("ok"):
+                    try:
+                        # write-through to this host's LICENSE_DB; only helps apps reading the same file
+                        license_store.get_store().record_issued(email, license_key, plan, expires_at)
+                    except Exception as e:
+                        print("license replica write error:", e)
+                try:
+                    done = apps_complete_pending(tax_id, txid)
+                    print("→ Completed pending:", done)
+                except Exception as e:
+                    print("completePending error:", e)
+                seen.add(txid)
+                processed += 1
             except Exception as e:
-                print("completePending error:", e)
-            seen.add(txid)
-            processed += 1
-        except Exception as e:
-            print("POST error:", e)
-
-    if processed:
-        save_state(seen)
-        print(f"✅ Processed {processed} new transaction(s).")
+                print("POST error:", e)
+                failed.append(tx)
+
+        if processed:
+            save_state(seen)
+        # every older page is done; the next run re-reads from OVERLAP_MS before the mark
+        now_ms = int(datetime.now().timestamp() * 1000)
+        held = failed + [t for t in unmatched if now_ms - t["block_ts"] < UNMATCHED_RETRY_MS]
+        mark = min(held, key=lambda t: t["block_ts"]) if held else (txs[-1] if txs else None)
+        if mark and mark["block_ts"] > since_ms:
+            save_cursor(mark["block_ts"], mark["txid"])
+            since_ms = mark["block_ts"]
+
+    if not fetched:
+        print("No transfers found (or API offline).")
+    elif processed:
+        print(f"✅ Processed {processed} new transaction(s) of {fetched} fetched.")
     else:
-        print("No new payable transactions.")
+        print(f"No new payable transactions in {fetched} fetched.")
+    print(f"Cursor → block_ts={since_ms}")
+    print(http_client.summary())
 
 if __name__ == "__main__":
     main()